@@ -1,10 +1,11 @@
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 from sklearn.cluster import KMeans
 import numpy as np
 import json
 import os
+
+from services.embedding_service import encode_many
 def load_rag_chunks(file_path):
     loader = UnstructuredFileLoader(file_path)
     documents = loader.load()
@@ -19,8 +20,7 @@ def load_rag_chunks(file_path):
     texts = [chunk.page_content.strip() for chunk in chunks if chunk.page_content.strip()]
     return texts
 def embed_chunks(chunks):
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    embeddings = model.encode(chunks)
+    embeddings = encode_many(chunks)
     return embeddings
 def cluster_intents(chunks, embeddings, num_intents=6):
     kmeans = KMeans(
@@ -0,0 +1,171 @@
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from doc_chunker import CHUNK_OVERLAP
+from services.session_store import estimate_tokens
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# Prompt tokens available for retrieved context (about four 300-char chunks)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "300"))
+
+# Hits retrieved as candidates for packing
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))
+
+# The prompt used to join the top 4 hits (rag_search's default); packed
+# context never exceeds that join, and savings are reported against it
+CONTEXT_BASELINE_HITS = int(os.getenv("CONTEXT_BASELINE_HITS", "4"))
+
+# MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+
+# Shortest shared edge (in characters) treated as splitter overlap
+MIN_MERGE_OVERLAP = 20
+MAX_MERGE_OVERLAP = CHUNK_OVERLAP * 2
+
+
+@dataclass
+class PackedContext:
+    text: str
+    hits: List[dict] = field(default_factory=list)  # hits whose text is in `text`
+    tokens: int = 0
+    tokens_saved: int = 0                            # vs. joining the top baseline hits
+
+# --------------------------------------------------
+# MMR (vectorised, incremental max-similarity)
+# --------------------------------------------------
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_order(query_vec, doc_vecs, lam: float = MMR_LAMBDA) -> List[int]:
+    """Every candidate index, in maximal-marginal-relevance order."""
+    docs = _normalize_rows(np.asarray(doc_vecs, dtype=np.float32))
+    query = np.asarray(query_vec, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    relevance = docs @ query
+    pairwise = docs @ docs.T
+
+    n = len(docs)
+    order: List[int] = []
+    chosen = np.zeros(n, dtype=bool)
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+
+    for _ in range(n):
+        redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+        mmr = lam * relevance - (1 - lam) * redundancy
+        mmr[chosen] = -np.inf
+
+        best = int(np.argmax(mmr))
+        order.append(best)
+        chosen[best] = True
+        max_sim = np.maximum(max_sim, pairwise[best])
+
+    return order
+
+# --------------------------------------------------
+# OVERLAP MERGING
+# --------------------------------------------------
+def _edge_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    longest = min(len(left), len(right), MAX_MERGE_OVERLAP)
+    for k in range(longest, MIN_MERGE_OVERLAP - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def _joined_tokens(units: List[str]) -> int:
+    return estimate_tokens("\n".join(units)) if units else 0
+
+
+def _merge_pair(left: str, right: str) -> Optional[str]:
+    """`left` and `right` as one text if one contains or overlaps the other."""
+    if right in left:
+        return left
+    if left in right:
+        return right
+
+    overlap = _edge_overlap(left, right)
+    if overlap:
+        return left + right[overlap:]
+
+    overlap = _edge_overlap(right, left)
+    if overlap:
+        return right + left[overlap:]
+
+    return None
+
+
+def _merge_into(units: List[str], text: str):
+    """
+    Add `text` to the packed units; returns (units, tokens added). A chunk
+    that bridges several units joins them all into one, so no overlap text
+    is left in the prompt twice.
+    """
+    merged, first = text, None
+    rest = list(enumerate(units))
+
+    changed = True
+    while changed:
+        changed = False
+        for pos, (i, unit) in enumerate(rest):
+            joined = _merge_pair(unit, merged)
+            if joined is not None:
+                merged, changed = joined, True
+                first = i if first is None else min(first, i)
+                del rest[pos]
+                break
+
+    if first is None:
+        updated = units + [merged]
+    else:
+        updated = (
+            [unit for i, unit in rest if i < first]
+            + [merged]
+            + [unit for i, unit in rest if i > first]
+        )
+
+    return updated, _joined_tokens(updated) - _joined_tokens(units)
+
+# --------------------------------------------------
+# PACKING
+# --------------------------------------------------
+def pack_context(
+    hits: List[dict],
+    query_vec,
+    doc_vecs,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    baseline_hits: int = CONTEXT_BASELINE_HITS
+) -> PackedContext:
+    """
+    Pick hits in MMR order, merging chunks that share splitter overlap,
+    until the token budget is full (hits that don't fit are skipped).
+    The budget is capped at the size of the old top-`baseline_hits` join.
+    """
+    if not hits:
+        return PackedContext("", [], 0, 0)
+
+    baseline = estimate_tokens("\n".join(hit["text"] for hit in hits[:baseline_hits]))
+    budget = min(budget, baseline)
+
+    units: List[str] = []
+    used: List[dict] = []
+    tokens = 0
+
+    for i in mmr_order(query_vec, doc_vecs):
+        candidate, added = _merge_into(units, hits[i]["text"].strip())
+        if tokens + added > budget:
+            continue
+
+        units, tokens = candidate, tokens + added
+        used.append(hits[i])
+
+    return PackedContext("\n".join(units), used, tokens, max(0, baseline - tokens))
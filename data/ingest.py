@@ -0,0 +1,115 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from doc_chunker import SUPPORTED_EXTENSIONS, load_chunks
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def find_documents(directory: str):
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def parse_document(path: str):
+    # Runs in a worker process: parsing + chunking only, no model / DB imports
+    return path, load_chunks(path)
+
+# -----------------------------
+# Ingestion
+# -----------------------------
+def ingest(directory: str, workers: int, batch_size: int, prune: bool):
+    # Workers are spawned, not forked, so they never inherit the model, the
+    # DB clients or the indexes that importing rag_engine creates here
+    from rag_engine import index_chunks, lexical_index, load_manifest, remove_document, source_key
+
+    files = find_documents(directory)
+    total = len(files)
+    print(f"\n📂 Ingesting {total} documents from {directory} ({workers} workers)\n")
+
+    added = removed = unchanged = failed = 0
+    start = time.time()
+    done_count = 0
+
+    # The BM25 file is written once at the end instead of once per document
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as pool, lexical_index.deferred():
+        pending = set()
+        queue = iter(files)
+
+        # Keep at most 2 parsed-but-not-indexed documents per worker in memory
+        def refill():
+            while len(pending) < workers * 2:
+                path = next(queue, None)
+                if path is None:
+                    return
+                pending.add(pool.submit(parse_document, path))
+
+        refill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                pending.discard(future)
+                done_count += 1
+
+                try:
+                    path, chunks = future.result()
+                    stats = index_chunks(path, chunks, batch_size=batch_size)
+                except Exception as e:
+                    failed += 1
+                    print(f"[{done_count}/{total}] ❌ {e}")
+                    continue
+
+                added += stats["added"]
+                removed += stats["removed"]
+                unchanged += stats["unchanged"]
+
+                elapsed = time.time() - start
+                print(
+                    f"[{done_count}/{total}] {os.path.basename(path)}: "
+                    f"+{stats['added']} -{stats['removed']} ={stats['unchanged']} "
+                    f"({added / elapsed:.1f} chunks/s)"
+                )
+
+            refill()
+
+    # ---------- Documents deleted from the directory ----------
+    if prune:
+        root = source_key(directory) + os.sep
+        present = {source_key(f) for f in files}
+        for source in list(load_manifest()["documents"]):
+            if source.startswith(root) and source not in present:
+                removed += remove_document(source)
+                print(f"🗑️ Removed {os.path.basename(source)}")
+
+    elapsed = time.time() - start
+    print("\n📊 INGESTION SUMMARY\n")
+    print(f"Documents: {total - failed}/{total} indexed")
+    print(f"Chunks: {added} added, {removed} removed, {unchanged} unchanged")
+    print(f"Elapsed: {elapsed:.1f}s ({total / elapsed if elapsed else 0:.2f} docs/s, "
+          f"{added / elapsed if elapsed else 0:.1f} chunks/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a directory of policy documents (docx/pdf/txt).")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="chunks embedded and upserted per batch")
+    parser.add_argument("--prune", action="store_true",
+                        help="remove indexed documents no longer present in the directory")
+    args = parser.parse_args()
+
+    ingest(args.directory, args.workers, args.batch_size, args.prune)
@@ -0,0 +1,63 @@
+import os
+from typing import List
+
+from langchain_community.document_loaders import UnstructuredFileLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+SUPPORTED_EXTENSIONS = {".docx", ".pdf", ".txt"}
+
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+
+# --------------------------------------------------
+# LOAD + CHUNK ONE DOCUMENT
+# --------------------------------------------------
+# Kept free of model / database imports so it can run in worker processes.
+def load_chunks(source_file: str) -> List[dict]:
+    """Split a document into [{"text", "source_file", "section", "page"}, ...]."""
+    loader = UnstructuredFileLoader(source_file, mode="elements")
+    elements = loader.load()
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+    # Group consecutive elements under the most recent title
+    sections = []
+    title, page, parts = "", None, []
+    for el in elements:
+        text = el.page_content.strip()
+        if not text:
+            continue
+
+        if el.metadata.get("category") == "Title":
+            if parts:
+                sections.append((title, page, parts))
+            title, page, parts = text, el.metadata.get("page_number"), []
+            continue
+
+        if page is None:
+            page = el.metadata.get("page_number")
+        parts.append(text)
+
+    if parts:
+        sections.append((title, page, parts))
+
+    chunks = []
+    for title, page, parts in sections:
+        body = "\n".join(parts)
+        if title:
+            body = f"{title}\n{body}"
+
+        for text in splitter.split_text(body):
+            text = text.strip()
+            if text:
+                chunks.append({
+                    "text": text,
+                    "source_file": os.path.basename(source_file),
+                    "section": title,
+                    "page": page,
+                })
+
+    return chunks
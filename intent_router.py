@@ -1,53 +1,127 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional, Tuple
+import os
+from typing import List, Optional, Tuple
 
-from sentence_transformers import SentenceTransformer, util
-from ocr_utils import extract_text_from_image 
+import numpy as np
 
-# LOAD MODEL
-# --------------------------------------------------
-intent_model = SentenceTransformer("all-MiniLM-L6-v2")
+from ocr_utils import extract_text_async, extract_text_from_image
+from services import tracing
+from services.embedding_service import MODEL_NAME, QUANTIZATION, encode_many
+
+INTENT_FILE = "auto_intents.json"
+INTENT_CACHE_DIR = os.getenv("INTENT_CACHE_DIR", ".cache")
+INTENT_THRESHOLD = 0.45
 
 # LOAD AUTO-GENERATED INTENTS
 # --------------------------------------------------
-with open("auto_intents.json", "r", encoding="utf-8") as f:
-    INTENT_MAP = json.load(f)
+with open(INTENT_FILE, "rb") as f:
+    _INTENT_BYTES = f.read()
 
-# PRECOMPUTE INTENT EMBEDDINGS
-# --------------------------------------------------
-INTENT_EMBEDDINGS = {
-    intent: intent_model.encode(texts, convert_to_tensor=True)
-    for intent, texts in INTENT_MAP.items()
+INTENT_MAP = {
+    intent: texts
+    for intent, texts in json.loads(_INTENT_BYTES.decode("utf-8")).items()
+    if texts
 }
 
+# --------------------------------------------------
+# EXEMPLAR MATRIX (all intents stacked, L2-normalised)
+# --------------------------------------------------
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _load_exemplar_matrix() -> np.ndarray:
+    # Cached on disk, keyed by model + quantization + intents file content
+    model_id = f"{MODEL_NAME}:{QUANTIZATION}"
+    digest = hashlib.sha256(model_id.encode("utf-8") + _INTENT_BYTES).hexdigest()[:16]
+    cache_path = os.path.join(INTENT_CACHE_DIR, f"intent_embeddings_{digest}.npy")
+
+    if os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    texts = [text for texts in INTENT_MAP.values() for text in texts]
+    matrix = _normalize_rows(encode_many(texts)).astype(np.float32)
+
+    os.makedirs(INTENT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, matrix)
+    os.replace(tmp_path, cache_path)
+
+    return matrix
+
+
+INTENT_NAMES = list(INTENT_MAP)
+_counts = [len(INTENT_MAP[name]) for name in INTENT_NAMES]
+
+# Row i of EXEMPLAR_MATRIX belongs to INTENT_NAMES[EXEMPLAR_INTENT[i]];
+# each intent's rows are contiguous and start at INTENT_OFFSETS[k]
+EXEMPLAR_MATRIX = _load_exemplar_matrix()
+EXEMPLAR_INTENT = np.repeat(np.arange(len(INTENT_NAMES)), _counts)
+INTENT_OFFSETS = np.concatenate(([0], np.cumsum(_counts)[:-1])).astype(np.intp)
+INTENT_CENTROIDS = _normalize_rows(
+    np.add.reduceat(EXEMPLAR_MATRIX, INTENT_OFFSETS, axis=0) / np.asarray(_counts)[:, None]
+).astype(np.float32)
+
 # INTENT DETECTION (CORE)
 # --------------------------------------------------
-def _detect_from_text(text: str, threshold: float) -> Tuple[Optional[str], float]:
-    if not text:
-        return None, 0.0
+def _score_intents(query_vecs: np.ndarray) -> np.ndarray:
+    """(n, dim) query vectors -> (n, n_intents) best cosine per intent."""
+    sims = _normalize_rows(query_vecs) @ EXEMPLAR_MATRIX.T
+    return np.maximum.reduceat(sims, INTENT_OFFSETS, axis=1)
+
+
+def _match(scores: np.ndarray, threshold: float) -> List[Tuple[Optional[str], float]]:
+    best = scores.argmax(axis=1)
+    results = []
+    for row, k in enumerate(best):
+        best_score = float(scores[row, k])
+        results.append((INTENT_NAMES[k] if best_score >= threshold else None, best_score))
+    return results
 
-    query_emb = intent_model.encode(text, convert_to_tensor=True)
 
-    best_intent = None
-    best_score = 0.0
+def detect_intents(
+    queries: List[str],
+    threshold: float = INTENT_THRESHOLD
+) -> List[Tuple[Optional[str], float]]:
+    """Batch intent detection (one encode + one matmul for all queries)."""
+    results: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(queries)
 
-    for intent, emb in INTENT_EMBEDDINGS.items():
-        score = util.cos_sim(query_emb, emb).max().item()
-        if score > best_score:
-            best_score = score
-            best_intent = intent
+    present = [i for i, q in enumerate(queries) if q]
+    if not present:
+        return results
 
-    if best_score < threshold:
-        return None, best_score
+    matches = _match(_score_intents(encode_many([queries[i] for i in present])), threshold)
+    for i, match in zip(present, matches):
+        results[i] = match
 
-    return best_intent, best_score
+    return results
+
+
+def _detect_from_text(text: str, threshold: float) -> Tuple[Optional[str], float, Optional[np.ndarray]]:
+    """(intent, score, query vector) for one text."""
+    if not text:
+        return None, 0.0, None
+
+    query_vec = encode_many([text])[0]
+    intent, score = _match(_score_intents(query_vec[None, :]), threshold)[0]
+    return intent, score, query_vec
+
+
+def intent_centroid(intent: str) -> np.ndarray:
+    """Mean of an intent's exemplar vectors (used to find its live chunks)."""
+    return INTENT_CENTROIDS[INTENT_NAMES.index(intent)]
 
 # PUBLIC API (TEXT OR IMAGE)
 # --------------------------------------------------
 def detect_intent(
     query: Optional[str] = None,
     image_path: Optional[str] = None,
-    threshold: float = 0.45
+    threshold: float = INTENT_THRESHOLD
 ) -> Tuple[Optional[str], float, str]:
 
     extracted_text = ""
@@ -58,12 +132,43 @@ def detect_intent(
         extracted_text = extract_text_from_image(image_path)
         print(f"📝 OCR extracted text: {extracted_text}")
 
-        intent, score = _detect_from_text(extracted_text, threshold)
+        intent, score, _ = _detect_from_text(extracted_text, threshold)
         return intent, score, extracted_text
 
     # Text-based intent
     if query:
-        intent, score = _detect_from_text(query, threshold)
+        intent, score, _ = _detect_from_text(query, threshold)
         return intent, score, query
 
     return None, 0.0, ""
+
+
+# ASYNC API (OCR in the process pool, scoring off the event loop)
+# --------------------------------------------------
+async def detect_intent_async(
+    query: Optional[str] = None,
+    image: Optional[bytes] = None,
+    threshold: float = INTENT_THRESHOLD
+) -> Tuple[Optional[str], float, str, Optional[np.ndarray]]:
+    """
+    `image` is the uploaded image as bytes. Also returns
+    the embedding of the scored text so callers need not encode it again.
+    """
+
+    # Image-based intent
+    if image:
+        with tracing.stage("ocr"):
+            extracted_text = await extract_text_async(image)
+        print(f"📝 OCR extracted text: {extracted_text}")
+
+        with tracing.stage("intent_detection"):
+            intent, score, vec = await asyncio.to_thread(_detect_from_text, extracted_text, threshold)
+        return intent, score, extracted_text, vec
+
+    # Text-based intent
+    if query:
+        with tracing.stage("intent_detection"):
+            intent, score, vec = await asyncio.to_thread(_detect_from_text, query, threshold)
+        return intent, score, query, vec
+
+    return None, 0.0, "", None
@@ -0,0 +1,254 @@
+import re
+from typing import Dict, Iterable, Optional, Set
+
+# --------------------------------------------------
+# COMPILED MULTI-PATTERN MATCHER
+# --------------------------------------------------
+class KeywordMatcher:
+    """
+    Compiles {category: [phrases]} once into a single alternation regex.
+
+    Matching keeps the old `phrase in text` substring semantics. The regex
+    runs inside a lookahead with longest phrases first, so every start
+    position reports its longest phrase. Each phrase also carries the
+    categories of every shorter phrase that is its prefix, so one pass
+    returns exactly the categories a per-phrase scan would.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        phrase_categories: Dict[str, Set[str]] = {}
+        for category, phrases in categories.items():
+            for phrase in phrases:
+                phrase_categories.setdefault(phrase, set()).add(category)
+
+        self._categories = {
+            phrase: frozenset().union(
+                *(cats for other, cats in phrase_categories.items() if phrase.startswith(other))
+            )
+            for phrase in phrase_categories
+        }
+
+        alternation = "|".join(
+            re.escape(p) for p in sorted(phrase_categories, key=len, reverse=True)
+        )
+        self._pattern = re.compile(f"(?=({alternation}))")
+
+    def matches(self, text: str) -> bool:
+        return bool(text) and self._pattern.search(text) is not None
+
+    def categories(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if not text:
+            return found
+
+        for m in self._pattern.finditer(text):
+            found |= self._categories[m.group(1)]
+        return found
+
+# --------------------------------------------------
+# BANKING HINTS (by category)
+# --------------------------------------------------
+BANKING_HINTS = {
+
+    # ---------------- BASIC BANKING ----------------
+    "basic": [
+        "bank", "banking", "indusind", "indusind bank",
+        "branch", "bank branch", "registered office", "helpline",
+        "customer care", "contact", "contact number",
+    ],
+
+    # ---------------- ACCOUNTS ----------------
+    "accounts": [
+        "account", "savings account", "current account", "salary account",
+        "open account", "account opening", "online account",
+        "offline account", "account number", "account details",
+        "account type", "account variant", "account features",
+        "minimum balance", "average balance", "maintenance fee",
+        "dormant account", "reactivate account", "close account",
+    ],
+
+    # ---------------- PASSBOOK & PROFILE ----------------
+    "passbook_profile": [
+        "passbook", "passbook update", "update passbook",
+        "contact number change", "change contact number",
+        "mobile number", "change mobile", "update mobile",
+        "update details", "profile update", "personal details",
+        "registered mobile", "registered number",
+    ],
+
+    # ---------------- KYC & DOCUMENTS ----------------
+    "kyc_documents": [
+        "kyc", "video kyc", "pan", "pan card",
+        "aadhaar", "aadhar", "aadhaar card",
+        "id proof", "address proof",
+        "documents required", "required documents",
+        "eligibility", "age limit", "guardian",
+        "minor account",
+    ],
+
+    # ---------------- NOMINEE ----------------
+    "nominee": [
+        "nominee", "add nominee", "change nominee",
+        "nomination", "nominee update", "nominee deletion",
+    ],
+
+    # ---------------- DEPOSITS & WITHDRAWALS ----------------
+    "deposits_withdrawals": [
+        "deposit", "cash deposit", "withdraw", "cash withdrawal",
+        "atm", "cdm", "cheque", "cheque deposit",
+    ],
+
+    # ---------------- PAYMENTS & TRANSFERS ----------------
+    "payments_transfers": [
+        "neft", "rtgs", "imps", "upi",
+        "fund transfer", "money transfer",
+        "send money", "receive money",
+        "payment", "transaction", "transfer charges",
+        "ifsc", "swift", "nach", "auto debit",
+    ],
+
+    # ---------------- INTEREST & CHARGES ----------------
+    "interest_charges": [
+        "interest", "interest rate", "interest slab",
+        "charges", "fees", "service charges",
+        "processing fee", "penalty",
+        "late fee", "maintenance charges",
+    ],
+
+    # ---------------- CARDS (GENERAL) ----------------
+    "cards": [
+        "card", "debit card", "credit card",
+        "atm card", "rupay", "visa", "mastercard",
+        "contactless card",
+    ],
+
+    # ---------------- CREDIT CARD MANAGEMENT ----------------
+    "card_management": [
+        "card application", "apply credit card",
+        "card status", "card activation",
+        "block card", "unblock card",
+        "lost card", "stolen card",
+        "add on card", "add-on card",
+        "card limit", "increase limit",
+        "credit limit", "cash advance",
+    ],
+
+    # ---------------- CREDIT CARD PAYMENTS ----------------
+    "card_payments": [
+        "credit card bill", "bill payment",
+        "statement", "card statement",
+        "outstanding balance", "total due",
+        "minimum due", "due date",
+        "emi", "convert to emi",
+        "apr", "interest on card",
+    ],
+
+    # ---------------- REWARDS & BENEFITS ----------------
+    "rewards": [
+        "reward points", "redeem points",
+        "cashback", "offers", "discounts",
+        "lounge access", "airport lounge",
+        "movie tickets", "bookmyshow",
+        "insurance", "golf benefits",
+        "forex markup",
+    ],
+
+    # ---------------- LOANS (GENERAL) ----------------
+    "loans": [
+        "loan", "business loan", "personal loan",
+        "quick loan", "instant loan",
+        "collateral free loan",
+        "loan amount", "loan eligibility",
+        "loan tenure", "loan interest",
+    ],
+
+    # ---------------- LOAN PROCESS ----------------
+    "loan_process": [
+        "apply loan", "loan application",
+        "loan approval", "loan disbursal",
+        "emi", "emi date", "missed emi",
+        "pre emi", "pre-emi",
+        "foreclosure", "prepayment",
+        "loan charges",
+    ],
+
+    # ---------------- CREDIT SCORE ----------------
+    "credit_score": [
+        "cibil", "credit score",
+        "minimum cibil", "credit history",
+    ],
+
+    # ---------------- BUSINESS LOAN ----------------
+    "business_loan": [
+        "business vintage", "profitability",
+        "business age", "turnover",
+        "bank statement", "pdf statement",
+    ],
+
+    # ---------------- DIGITAL BANKING ----------------
+    "digital_banking": [
+        "net banking", "internet banking",
+        "mobile banking", "indie app",
+        "indusmobile", "online banking",
+    ],
+
+    # ---------------- SECURITY & SAFETY ----------------
+    "security": [
+        "fraud", "phishing", "security",
+        "safe banking", "card safety",
+        "otp", "pin", "cvv",  # (for detection, not answering)
+    ],
+
+}
+
+# --------------------------------------------------
+# POLICY / RAG KEYWORD LISTS
+# --------------------------------------------------
+RAG_TRIGGERS = [
+    "procedure", "steps", "how to open", "documents required",
+    "charges", "fees", "interest rate", "eligibility",
+    "indusind", "account opening", "kyc", "minimum balance"
+]
+
+CONTACT_UPDATE_KEYWORDS = [
+    "change contact number", "update contact number",
+    "change mobile", "update mobile",
+    "registered mobile", "passbook update"
+]
+
+# Whole-message small talk (matched exactly, after normalisation)
+SMALLTALK = {
+    "greeting": [
+        "hi", "hii", "hello", "hey", "hi there", "hello there",
+        "good morning", "good afternoon", "good evening", "namaste",
+    ],
+    "thanks": ["thanks", "thank you", "thank you so much", "thanks a lot", "ok thanks"],
+    "goodbye": ["bye", "goodbye", "bye bye", "see you", "good night"],
+}
+
+# Checked in this priority order by decide_contact_update_path
+CONTACT_UPDATE_PATHS = {
+    "branch_only": ["lost phone", "sim lost", "number inactive"],
+    "customer_care_first": ["can't visit", "cannot visit", "far", "busy", "no time"],
+    "digital_optional": ["app", "net banking", "online"],
+}
+
+# --------------------------------------------------
+# COMPILED MATCHERS (built once at import)
+# --------------------------------------------------
+BANKING_MATCHER = KeywordMatcher(BANKING_HINTS)
+RAG_TRIGGER_MATCHER = KeywordMatcher({"rag": RAG_TRIGGERS})
+CONTACT_UPDATE_MATCHER = KeywordMatcher({"contact_update": CONTACT_UPDATE_KEYWORDS})
+CONTACT_PATH_MATCHER = KeywordMatcher(CONTACT_UPDATE_PATHS)
+
+SMALLTALK_KIND = {phrase: kind for kind, phrases in SMALLTALK.items() for phrase in phrases}
+
+
+def smalltalk_kind(query: str) -> Optional[str]:
+    """"greeting" / "thanks" / "goodbye" when the whole message is small talk."""
+    return SMALLTALK_KIND.get(query.strip())
+
+
+def banking_categories(query: str) -> Set[str]:
+    """Banking hint categories present in the query (empty set = not banking)."""
+    return BANKING_MATCHER.categories(query)
@@ -0,0 +1,225 @@
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(".cache", "bm25"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or "
+    "the to what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _pack(strings: List[str]) -> np.ndarray:
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack(blob: np.ndarray) -> List[str]:
+    text = blob.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+# --------------------------------------------------
+# BM25 INDEX (doc-major CSR on disk, term-major postings in memory)
+# --------------------------------------------------
+class BM25Index:
+    """
+    Sparse inverted index over chunk texts, keyed by chunk id.
+
+    Stored as one compressed .npz: the vocabulary and chunk ids as packed
+    UTF-8, plus each chunk's (term id, term frequency) pairs in CSR form.
+    Postings are rebuilt from that on load; other processes pick up
+    changes on their next search.
+    """
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._defer_depth = 0
+        self._dirty = False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._load()
+
+    # ---------- Persistence ----------
+    def _load(self):
+        if os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as data:
+                vocab = _unpack(data["vocab"])
+                doc_ids = _unpack(data["doc_ids"])
+                indptr = data["indptr"].astype(np.int64)
+                terms = data["terms"].astype(np.int32)
+                tfs = data["tfs"].astype(np.float32)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        else:
+            vocab, doc_ids = [], []
+            indptr = np.zeros(1, dtype=np.int64)
+            terms = np.zeros(0, dtype=np.int32)
+            tfs = np.zeros(0, dtype=np.float32)
+
+        self._set_state(vocab, doc_ids, indptr, terms, tfs)
+
+    def _set_state(self, vocab, doc_ids, indptr, terms, tfs):
+        self._vocab = vocab
+        self._term_id = {t: i for i, t in enumerate(vocab)}
+        self._doc_ids = doc_ids
+        self._doc_row = {d: i for i, d in enumerate(doc_ids)}
+        self._indptr, self._terms, self._tfs = indptr, terms, tfs
+
+        # Transpose into term-major postings for query time
+        n_docs = len(doc_ids)
+        doc_of_entry = np.repeat(np.arange(n_docs, dtype=np.int32), np.diff(indptr))
+        order = np.argsort(terms, kind="stable")
+
+        self._post_docs = doc_of_entry[order]
+        self._post_tfs = tfs[order]
+        df = np.bincount(terms, minlength=len(vocab))
+        self._post_indptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        self._idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._doc_len = np.bincount(doc_of_entry, weights=tfs, minlength=n_docs).astype(np.float32)
+        self._avg_len = float(self._doc_len.mean()) if n_docs else 0.0
+
+    def _maybe_reload(self):
+        if self._dirty or not os.path.exists(self.path):
+            return
+        if os.stat(self.path).st_mtime_ns != self._loaded_mtime:
+            self._load()
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            vocab=_pack(self._vocab),
+            doc_ids=_pack(self._doc_ids),
+            indptr=self._indptr,
+            terms=self._terms,
+            tfs=np.minimum(self._tfs, np.iinfo(np.uint16).max).astype(np.uint16),
+        )
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        self._dirty = False
+
+    @contextmanager
+    def deferred(self):
+        """Apply many updates in memory and write the file once at the end."""
+        with self._lock:
+            self._maybe_reload()
+            self._defer_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._defer_depth -= 1
+                if self._defer_depth == 0 and self._dirty:
+                    self._save()
+
+    # ---------- Updates ----------
+    def update(self, add: Dict[str, str] = None, remove: Iterable[str] = ()):
+        """Add or replace chunks (chunk_id -> text) and drop removed ids."""
+        add = add or {}
+        drop = set(remove) | set(add)
+
+        with self._lock:
+            self._maybe_reload()
+            if not add and not drop.intersection(self._doc_row):
+                return
+
+            vocab = list(self._vocab)
+            term_id = dict(self._term_id)
+
+            keep = [i for i, d in enumerate(self._doc_ids) if d not in drop]
+            keep_mask = np.zeros(len(self._doc_ids), dtype=bool)
+            keep_mask[keep] = True
+            lengths = np.diff(self._indptr)
+            keep_entries = np.repeat(keep_mask, lengths)
+
+            doc_ids = [self._doc_ids[i] for i in keep]
+            term_parts = [self._terms[keep_entries]]
+            tf_parts = [self._tfs[keep_entries]]
+            length_parts = [lengths[keep]]
+
+            for chunk_id, text in add.items():
+                counts = Counter(tokenize(text))
+                ids = []
+                for term in counts:
+                    if term not in term_id:
+                        term_id[term] = len(vocab)
+                        vocab.append(term)
+                    ids.append(term_id[term])
+
+                order = np.argsort(ids)
+                doc_ids.append(chunk_id)
+                term_parts.append(np.asarray(ids, dtype=np.int32)[order])
+                tf_parts.append(np.asarray(list(counts.values()), dtype=np.float32)[order])
+                length_parts.append(np.asarray([len(ids)], dtype=np.int64))
+
+            indptr = np.concatenate(([0], np.cumsum(np.concatenate(length_parts)))).astype(np.int64)
+            self._set_state(
+                vocab,
+                doc_ids,
+                indptr,
+                np.concatenate(term_parts).astype(np.int32),
+                np.concatenate(tf_parts).astype(np.float32),
+            )
+            self._dirty = True
+
+            if self._defer_depth == 0:
+                self._save()
+
+    # ---------- Queries ----------
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._doc_row
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top `limit` (chunk_id, bm25 score) pairs, best first."""
+        with self._lock:
+            self._maybe_reload()
+            term_id, idf = self._term_id, self._idf
+            post_indptr, post_docs, post_tfs = self._post_indptr, self._post_docs, self._post_tfs
+            doc_len, avg_len, doc_ids = self._doc_len, self._avg_len, self._doc_ids
+
+        ids = {term_id[t] for t in tokenize(query) if t in term_id}
+        if not ids or not doc_ids:
+            return []
+
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / (avg_len or 1.0))
+
+        for t in ids:
+            start, end = post_indptr[t], post_indptr[t + 1]
+            docs, tf = post_docs[start:end], post_tfs[start:end]
+            scores[docs] += idf[t] * tf * (self.k1 + 1) / (tf + norm[docs])
+
+        matched = np.flatnonzero(scores)
+        k = min(limit, matched.size)
+        if k == 0:
+            return []
+
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(doc_ids[i], float(scores[i])) for i in top]
+
+
+def create_lexical_index(collection: str) -> BM25Index:
+    return BM25Index(os.path.join(LEXICAL_INDEX_PATH, f"{collection}.npz"))
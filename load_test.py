@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+EVAL_FILE = "eval_questions.json"
+OUTPUT_FILE = "load_metrics.json"
+
+MOCK_LLM_HOST = "127.0.0.1"
+MOCK_LLM_PORT = int(os.getenv("MOCK_LLM_PORT", "8765"))
+MOCK_LLM_REPLY = (
+    "You can transfer funds through NEFT using net banking or by visiting "
+    "your nearest branch. Please contact customer care for further assistance."
+)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".webp")
+
+# -----------------------------
+# Mock LLM (OpenAI-compatible, configurable latency)
+# -----------------------------
+def create_mock_llm(latency: float, jitter: float, tokens_per_second: float):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    mock = FastAPI()
+    words = MOCK_LLM_REPLY.split(" ")
+
+    def delay() -> float:
+        return max(0.0, random.gauss(latency, jitter))
+
+    @mock.post("/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        await asyncio.sleep(delay())
+
+        if not payload.get("stream"):
+            return {
+                "choices": [
+                    {"message": {"role": "assistant", "content": MOCK_LLM_REPLY}}
+                ]
+            }
+
+        async def events():
+            for i, word in enumerate(words):
+                token = word if i == 0 else " " + word
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if tokens_per_second > 0:
+                    await asyncio.sleep(1 / tokens_per_second)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return mock
+
+
+def start_mock_llm(latency: float, jitter: float, tokens_per_second: float, port: int = MOCK_LLM_PORT):
+    """Serve the mock LLM on a background thread; returns the uvicorn server."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        create_mock_llm(latency, jitter, tokens_per_second),
+        host=MOCK_LLM_HOST,
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return server
+
+# -----------------------------
+# Workload
+# -----------------------------
+def load_workload(eval_file: str, image_dir: str | None):
+    with open(eval_file, "r") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    images = []
+    if image_dir:
+        for name in sorted(os.listdir(image_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(image_dir, name), "rb") as f:
+                    images.append((name, f.read()))
+
+    return questions, images
+
+
+def build_requests(questions, images, total: int, image_ratio: float, seed: int):
+    rng = random.Random(seed)
+    requests = []
+
+    for i in range(total):
+        image = None
+        if images and rng.random() < image_ratio:
+            image = images[i % len(images)]
+        requests.append((f"load-{i}", questions[i % len(questions)], image))
+
+    return requests
+
+# -----------------------------
+# Client
+# -----------------------------
+async def send(client, path: str, stream: bool, session_id: str, message: str, image,
+               measure_first_byte: bool = True):
+    data = {"session_id": session_id, "message": message}
+    files = {"image": (image[0], image[1])} if image else None
+
+    start = time.perf_counter()
+    first_byte = None
+
+    if not stream:
+        response = await client.post(path, data=data, files=files)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        return response.json(), elapsed, None
+
+    done = None
+    async with client.stream("POST", path, data=data, files=files) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            if first_byte is None and measure_first_byte:
+                first_byte = time.perf_counter() - start
+            frame = json.loads(line)
+            if frame["type"] == "done":
+                done = frame
+
+    return done or {}, time.perf_counter() - start, first_byte
+
+
+async def run_load(client, requests, concurrency: int, stream: bool, measure_first_byte: bool = True):
+    path = "/chatbot/ask/stream" if stream else "/chatbot/ask"
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+
+    results = []
+
+    async def worker():
+        while True:
+            try:
+                session_id, message, image = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                payload, elapsed, first_byte = await send(
+                    client, path, stream, session_id, message, image, measure_first_byte
+                )
+                metrics = payload.get("metrics", {})
+                results.append({
+                    "route": metrics.get("route", "unknown"),
+                    "latency": elapsed,
+                    "first_byte": first_byte,
+                    "server_latency": metrics.get("latency"),
+                    # The server flags replies served because the LLM call failed
+                    "fallback": bool(metrics.get("llm_fallback")),
+                    "error": None,
+                })
+            except Exception as e:
+                results.append({
+                    "route": "error",
+                    "latency": None,
+                    "first_byte": None,
+                    "server_latency": None,
+                    "fallback": False,
+                    "error": type(e).__name__,
+                })
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+# -----------------------------
+# Report
+# -----------------------------
+def summarize(rows, wall_time: float) -> dict:
+    latencies = np.array([r["latency"] for r in rows if r["latency"] is not None], dtype=float)
+    first_bytes = np.array([r["first_byte"] for r in rows if r["first_byte"] is not None], dtype=float)
+    errors = sum(1 for r in rows if r["error"] or r["fallback"])
+
+    summary = {
+        "requests": len(rows),
+        "errors": errors,
+        "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+        "throughput_rps": round(len(rows) / wall_time, 2) if wall_time else 0.0,
+    }
+
+    if latencies.size:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        summary.update({
+            "mean_ms": round(float(latencies.mean()) * 1000, 1),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+        })
+
+    server = [r["server_latency"] for r in rows if r["server_latency"] is not None]
+    if server:
+        summary["server_p50_ms"] = round(float(np.percentile(server, 50)) * 1000, 1)
+
+    if first_bytes.size:
+        summary["first_byte_p50_ms"] = round(float(np.percentile(first_bytes, 50)) * 1000, 1)
+
+    error_types = {}
+    for r in rows:
+        if r["error"]:
+            error_types[r["error"]] = error_types.get(r["error"], 0) + 1
+    if error_types:
+        summary["error_types"] = error_types
+
+    return summary
+
+
+def build_report(results, wall_time: float, config: dict) -> dict:
+    by_route = {}
+    for r in results:
+        by_route.setdefault(r["route"], []).append(r)
+
+    return {
+        "config": config,
+        "overall": summarize(results, wall_time),
+        "routes": {
+            route: summarize(rows, wall_time)
+            for route, rows in sorted(by_route.items())
+        },
+    }
+
+
+def print_report(report: dict):
+    print("\n📊 LOAD TEST SUMMARY\n")
+    print(
+        f"Requests: {report['config']['requests']}  "
+        f"Concurrency: {report['config']['concurrency']}  "
+        f"Wall time: {report['config']['wall_time_s']}s"
+    )
+
+    header = f"{'route':<14}{'reqs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+    print(header)
+    print("-" * len(header))
+
+    rows = [("overall", report["overall"])] + list(report["routes"].items())
+    for route, s in rows:
+        print(
+            f"{route:<14}{s['requests']:>6}{s['throughput_rps']:>9}"
+            f"{s.get('p50_ms', '-'):>10}{s.get('p95_ms', '-'):>10}{s.get('p99_ms', '-'):>10}"
+            f"{s['error_rate']:>9.1%}"
+        )
+
+# -----------------------------
+# Entry point
+# -----------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent load test for /chatbot/ask")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=None,
+                        help="total requests (default: 5 passes over the eval questions)")
+    parser.add_argument("--eval-file", default=EVAL_FILE)
+    parser.add_argument("--images", default=None, help="directory of image fixtures to upload")
+    parser.add_argument("--image-ratio", type=float, default=0.1,
+                        help="fraction of requests that attach an image")
+    parser.add_argument("--stream", action="store_true", help="use /chatbot/ask/stream")
+    parser.add_argument("--url", default=None,
+                        help="test a running server instead of the in-process app "
+                             "(start it with GROQ_API_URL pointing at --mock-only)")
+    parser.add_argument("--mock-only", action="store_true",
+                        help="only serve the mock LLM until interrupted")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="mock LLM latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    return parser.parse_args()
+
+
+async def main_async(args, requests):
+    import httpx
+
+    timeout = httpx.Timeout(120.0)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            return await run_load(client, requests, args.concurrency, args.stream)
+
+    # ASGITransport hands over the response only once it is complete, so
+    # time-to-first-byte can't be measured in-process
+    import main as app_module
+    from services.llm_client import close_clients
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://app", timeout=timeout
+        ) as client:
+            return await run_load(
+                client, requests, args.concurrency, args.stream, measure_first_byte=False
+            )
+    finally:
+        await close_clients()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    mock = None
+    if not args.url or args.mock_only:
+        mock = start_mock_llm(args.llm_latency, args.llm_jitter, args.llm_tokens_per_second)
+        # Must be set before main/services.llm_client are imported
+        os.environ["GROQ_API_URL"] = f"http://{MOCK_LLM_HOST}:{MOCK_LLM_PORT}"
+        os.environ.setdefault("GROQ_API_KEY", "load-test")
+        print(f"✅ Mock LLM listening on {os.environ['GROQ_API_URL']}")
+
+    if args.mock_only:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+
+    questions, images = load_workload(args.eval_file, args.images)
+    total = args.requests or len(questions) * 5
+    requests = build_requests(questions, images, total, args.image_ratio, args.seed)
+
+    print(f"\n🚀 LOAD TEST STARTED ({total} requests, concurrency {args.concurrency})\n")
+    results, wall_time = asyncio.run(main_async(args, requests))
+
+    report = build_report(results, wall_time, {
+        "target": args.url or "in-process",
+        "endpoint": "/chatbot/ask/stream" if args.stream else "/chatbot/ask",
+        "requests": total,
+        "concurrency": args.concurrency,
+        "images": len(images),
+        "image_ratio": args.image_ratio if images else 0.0,
+        "llm_latency_s": None if args.url else args.llm_latency,
+        "first_byte": "measured" if args.url else "unavailable in-process (use --url)",
+        "wall_time_s": round(wall_time, 2),
+    })
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\n✅ Results saved to {args.output}\n")
+
+    if mock is not None:
+        mock.should_exit = True
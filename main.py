@@ -1,18 +1,35 @@
-from fastapi import FastAPI, Form, UploadFile, File
+from fastapi import BackgroundTasks, FastAPI, Form, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-import requests
-from collections import defaultdict
-import time
-import shutil
-import os
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from dataclasses import replace
+import asyncio
+import json
 import re
-from spellchecker import SpellChecker
+import os
+from ocr_utils import ocr_cache_stats, shutdown_ocr_pool
 from text_utils import normalize_text
-from rag_engine import rag_search
-from intent_router import detect_intent
+from context_builder import CONTEXT_CANDIDATES, pack_context
+from rag_engine import intent_hits, rag_retrieve_with_vector, search_cache_stats
+from intent_router import detect_intent_async, intent_centroid
+from keyword_router import (
+    CONTACT_PATH_MATCHER,
+    RAG_TRIGGER_MATCHER,
+    banking_categories,
+)
+from query_router import (
+    ROUTE_INTENT,
+    ROUTE_LLM_ONLY,
+    ROUTE_PRECOMPUTED,
+    RouteDecision,
+    decide_route,
+    log_decision,
+)
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from services import tracing
+from services.answer_cache import ANSWER_CACHE_ENABLED, SemanticAnswerCache
+from services.embedding_service import encode_many
+from services.llm_client import LLMError, close_clients, groq_client
+from services.session_store import create_session_store
 
 # -----------------------------
 # APP SETUP
@@ -27,51 +44,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Uploads are read from the file Starlette already spooled, never copied to disk
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Allowance for the multipart boundaries and the other form fields
+UPLOAD_FORM_OVERHEAD = 64 * 1024
 
-# ADDED 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
 FAITHFULNESS_THRESHOLD = 0.25
 
+# "inline" -> scored before responding, "background" -> scored and logged
+# after the response is sent, "off" -> not scored
+FAITHFULNESS_MODE = os.getenv("FAITHFULNESS_MODE", "inline")
+# How per-sentence best-chunk similarities are combined: "mean" or "max"
+FAITHFULNESS_AGG = os.getenv("FAITHFULNESS_AGG", "mean")
+FAITHFULNESS_MAX_SENTENCES = 16
+
+# Opt-in: reuse RAG answers for near-duplicate queries over the same chunks
+ANSWER_CACHE = SemanticAnswerCache() if ANSWER_CACHE_ENABLED else None
+
 # -----------------------------
 # SPELL NORMALIZATION
 # -----------------------------
-spell = SpellChecker()
-
 def normalize_query(text: str) -> str:
-    if not text:
-        return ""
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-
-    corrected = []
-    for word in text.split():
-        if word.isalpha() and len(word) > 2:
-            corrected.append(spell.correction(word) or word)
-        else:
-            corrected.append(word)
-
-    return " ".join(corrected)
+    return normalize_text(text)
 
 # -----------------------------
-# CHAT MEMORY
+# CHAT MEMORY (bounded per session, idle sessions evicted)
 # -----------------------------
-CHAT_MEMORY = defaultdict(list)
+SESSION_STORE = create_session_store()
 
 # -----------------------------
 # GROQ CHAT
 # -----------------------------
-def groq_chat(session_id: str, user_prompt: str):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+LLM_FALLBACK_REPLY = "Hello! How can I assist you today?"
 
+def build_messages(session_id: str, user_prompt: str) -> list:
     messages = [
         {
             "role": "system",
@@ -91,46 +97,68 @@ def groq_chat(session_id: str, user_prompt: str):
         }
     ]
 
-    messages.extend(CHAT_MEMORY[session_id])
+    messages.extend(SESSION_STORE.get_history(session_id))
     messages.append({"role": "user", "content": user_prompt})
+    return messages
 
-    payload = {
-        "model": "llama-3.1-8b-instant",
-        "temperature": 0.7,
-        "messages": messages
-    }
 
-    res = requests.post(url, json=payload, headers=headers).json()
+def remember_turn(session_id: str, user_prompt: str, reply: str):
+    SESSION_STORE.append_turn(session_id, user_prompt, reply)
+
+
+async def groq_chat(session_id: str, user_prompt: str):
+    messages = build_messages(session_id, user_prompt)
+
+    try:
+        res = await groq_client.chat(
+            model="llama-3.1-8b-instant",
+            temperature=0.7,
+            messages=messages
+        )
+    except LLMError:
+        res = {}
 
     if "choices" not in res:
-        return "Hello! How can I assist you today?"
+        return LLM_FALLBACK_REPLY
 
     reply = res["choices"][0]["message"]["content"].strip()
-
-    CHAT_MEMORY[session_id].append({"role": "user", "content": user_prompt})
-    CHAT_MEMORY[session_id].append({"role": "assistant", "content": reply})
+    remember_turn(session_id, user_prompt, reply)
 
     return reply
 
-# -----------------------------
-# COSINE SIMILARITY
-# -----------------------------
-def cosine_similarity(a, b):
-    a = np.array(a)
-    b = np.array(b)
-    if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
-        return 0.0
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
+async def groq_chat_stream(session_id: str, user_prompt: str, outcome: dict | None = None):
+    """
+    Yield reply tokens. `outcome["fallback"]` is set when the LLM failed,
+    including mid-stream; a truncated reply is not remembered as a turn.
+    """
+    messages = build_messages(session_id, user_prompt)
+    outcome = {} if outcome is None else outcome
+    outcome["fallback"] = False
+    parts = []
+
+    try:
+        async for token in groq_client.stream_chat(
+            model="llama-3.1-8b-instant",
+            temperature=0.7,
+            messages=messages
+        ):
+            parts.append(token)
+            yield token
+    except LLMError:
+        outcome["fallback"] = True
+
+    if not parts:
+        outcome["fallback"] = True
+        yield LLM_FALLBACK_REPLY
+        return
+
+    if not outcome["fallback"]:
+        remember_turn(session_id, user_prompt, "".join(parts).strip())
 
 #-----------------------------------
 def needs_rag(query: str) -> bool:
-    rag_triggers = [
-        "procedure", "steps", "how to open", "documents required",
-        "charges", "fees", "interest rate", "eligibility",
-        "indusind", "account opening", "kyc", "minimum balance"
-    ]
-    return any(trigger in query for trigger in rag_triggers)
+    return RAG_TRIGGER_MATCHER.matches(query)
 
 #--------NO STARS-----------
 def clean_response(text: str) -> str:
@@ -139,16 +167,11 @@ def clean_response(text: str) -> str:
 # POLICY DECISION HELPERS (ADDED)
 # -----------------------------
 def decide_contact_update_path(query: str) -> str:
-    q = query.lower()
-
-    if any(x in q for x in ["lost phone", "sim lost", "number inactive"]):
-        return "branch_only"
+    paths = CONTACT_PATH_MATCHER.categories(query.lower())
 
-    if any(x in q for x in ["can't visit", "cannot visit", "far", "busy", "no time"]):
-        return "customer_care_first"
-
-    if any(x in q for x in ["app", "net banking", "online"]):
-        return "digital_optional"
+    for mode in ("branch_only", "customer_care_first", "digital_optional"):
+        if mode in paths:
+            return mode
 
     return "default"
 
@@ -192,211 +215,52 @@ def suggest_follow_up(mode: str) -> str | None:
 
     return "Would you like to know the documents required to update your mobile number?"
 
-# CHATBOT ENDPOINT
-# -----------------------------
-@app.post("/chatbot/ask")
-async def chatbot(
-    session_id: str = Form(...),
-    message: str = Form(""),
-    image: UploadFile = File(None)
-):
-    start_time = time.time()
-    image_path = None
 
-    # IMAGE UPLOAD
-    if image:
-        image_path = f"{UPLOAD_DIR}/{image.filename}"
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+SMALLTALK_REPLIES = {
+    "greeting": "Hello! Welcome to IndusInd Bank. How may I help you with your banking query today?",
+    "thanks": "You're welcome! Is there anything else I can help you with?",
+    "goodbye": "Thank you for contacting IndusInd Bank. Have a great day!",
+}
 
-    raw_query = (message or "").strip()
-    normalized_query = normalize_text(raw_query)
 
-    intent, score, detected_text = detect_intent(
-        query=normalized_query if normalized_query else None,
-        image_path=image_path
-    )
+def precomputed_reply(decision: RouteDecision, query: str) -> tuple:
+    """(reply, follow_up) for queries routed to ROUTE_PRECOMPUTED."""
+    if decision.reason == "contact_update":
+        mode = decide_contact_update_path(query)
+        return build_contact_update_response(mode), suggest_follow_up(mode)
 
-    final_query = normalized_query
-    latency = round(time.time() - start_time, 2)
+    return SMALLTALK_REPLIES.get(decision.reason, SMALLTALK_REPLIES["greeting"]), None
 
-        # ---------------- POLICY-GUARDED CONTACT UPDATE ----------------
-    contact_update_keywords = [
-        "change contact number", "update contact number",
-        "change mobile", "update mobile",
-        "registered mobile", "passbook update"
-    ]
+# UPLOAD HANDLING
+# -----------------------------
+@app.middleware("http")
+async def reject_oversized_bodies(request, call_next):
+    # Refuse before Starlette parses (and spools) the multipart body
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD:
+        return PlainTextResponse("Image too large", status_code=413)
+    return await call_next(request)
 
-    if final_query and any(k in final_query for k in contact_update_keywords):
-        mode = decide_contact_update_path(final_query)
-        reply = build_contact_update_response(mode)
-        follow_up = suggest_follow_up(mode)
 
-        return {
-            "reply": reply,
-            "follow_up": follow_up,
-            "metrics": {
-                "used_rag": False,
-                "latency": latency
-            }
-        }
+async def read_upload(upload: UploadFile) -> bytes:
+    """
+    Read the upload Starlette already spooled, enforcing MAX_UPLOAD_BYTES.
+    Disk-backed spools are read in Starlette's thread pool.
+    """
+    if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    data = await upload.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    return data
 
-    BANKING_HINTS = [
-
-    # ---------------- BASIC BANKING ----------------
-    "bank", "banking", "indusind", "indusind bank",
-    "branch", "bank branch", "registered office", "helpline",
-    "customer care", "contact", "contact number",
-
-    # ---------------- ACCOUNTS ----------------
-    "account", "savings account", "current account", "salary account",
-    "open account", "account opening", "online account",
-    "offline account", "account number", "account details",
-    "account type", "account variant", "account features",
-    "minimum balance", "average balance", "maintenance fee",
-    "dormant account", "reactivate account", "close account",
-
-    # ---------------- PASSBOOK & PROFILE ----------------
-    "passbook", "passbook update", "update passbook",
-    "contact number change", "change contact number",
-    "mobile number", "change mobile", "update mobile",
-    "update details", "profile update", "personal details",
-    "registered mobile", "registered number",
-
-    # ---------------- KYC & DOCUMENTS ----------------
-    "kyc", "video kyc", "pan", "pan card",
-    "aadhaar", "aadhar", "aadhaar card",
-    "id proof", "address proof",
-    "documents required", "required documents",
-    "eligibility", "age limit", "guardian",
-    "minor account",
-
-    # ---------------- NOMINEE ----------------
-    "nominee", "add nominee", "change nominee",
-    "nomination", "nominee update", "nominee deletion",
-
-    # ---------------- DEPOSITS & WITHDRAWALS ----------------
-    "deposit", "cash deposit", "withdraw", "cash withdrawal",
-    "atm", "cdm", "cheque", "cheque deposit",
-
-    # ---------------- PAYMENTS & TRANSFERS ----------------
-    "neft", "rtgs", "imps", "upi",
-    "fund transfer", "money transfer",
-    "send money", "receive money",
-    "payment", "transaction", "transfer charges",
-    "ifsc", "swift", "nach", "auto debit",
-
-    # ---------------- INTEREST & CHARGES ----------------
-    "interest", "interest rate", "interest slab",
-    "charges", "fees", "service charges",
-    "processing fee", "penalty",
-    "late fee", "maintenance charges",
-
-    # ---------------- CARDS (GENERAL) ----------------
-    "card", "debit card", "credit card",
-    "atm card", "rupay", "visa", "mastercard",
-    "contactless card",
-
-    # ---------------- CREDIT CARD MANAGEMENT ----------------
-    "card application", "apply credit card",
-    "card status", "card activation",
-    "block card", "unblock card",
-    "lost card", "stolen card",
-    "add on card", "add-on card",
-    "card limit", "increase limit",
-    "credit limit", "cash advance",
-
-    # ---------------- CREDIT CARD PAYMENTS ----------------
-    "credit card bill", "bill payment",
-    "statement", "card statement",
-    "outstanding balance", "total due",
-    "minimum due", "due date",
-    "emi", "convert to emi",
-    "apr", "interest on card",
-
-    # ---------------- REWARDS & BENEFITS ----------------
-    "reward points", "redeem points",
-    "cashback", "offers", "discounts",
-    "lounge access", "airport lounge",
-    "movie tickets", "bookmyshow",
-    "insurance", "golf benefits",
-    "forex markup",
-
-    # ---------------- LOANS (GENERAL) ----------------
-    "loan", "business loan", "personal loan",
-    "quick loan", "instant loan",
-    "collateral free loan",
-    "loan amount", "loan eligibility",
-    "loan tenure", "loan interest",
-
-    # ---------------- LOAN PROCESS ----------------
-    "apply loan", "loan application",
-    "loan approval", "loan disbursal",
-    "emi", "emi date", "missed emi",
-    "pre emi", "pre-emi",
-    "foreclosure", "prepayment",
-    "loan charges",
-
-    # ---------------- CREDIT SCORE ----------------
-    "cibil", "credit score",
-    "minimum cibil", "credit history",
-
-    # ---------------- BUSINESS LOAN ----------------
-    "business vintage", "profitability",
-    "business age", "turnover",
-    "bank statement", "pdf statement",
-
-    # ---------------- DIGITAL BANKING ----------------
-    "net banking", "internet banking",
-    "mobile banking", "indie app",
-    "indusmobile", "online banking",
-
-    # ---------------- SECURITY & SAFETY ----------------
-    "fraud", "phishing", "security",
-    "safe banking", "card safety",
-    "otp", "pin", "cvv",  # (for detection, not answering)
-
-]
-
-    is_probable_banking = any(hint in final_query for hint in BANKING_HINTS)
-    image_uploaded = bool(image)
-
-        # ---------------- BANKING QUERIES ----------------
-    if intent is not None or is_probable_banking or image_uploaded:
-
-        use_rag = True
-
-        # Case 1: Needs RAG
-        if use_rag:
-            context_chunks = rag_search(final_query)
-            context = "\n".join(context_chunks) if isinstance(context_chunks, list) else context_chunks
-
-            if not context or len(context.strip()) < 50:
-
-                # Banking-related question → LLM should answer
-                if intent is not None or is_probable_banking or image_uploaded:
-                    reply = groq_chat(session_id, final_query)
-                    return {
-                        "reply": reply,
-                        "metrics": {
-                            "used_rag": False,
-                            "latency": latency
-                        }
-                    }
-
-                #  Non-banking or general knowledge → allow LLM
-                reply = clean_response(groq_chat(session_id, final_query))
-                return {
-                    "reply": reply,
-                    "metrics": {
-                        "used_rag": False,
-                        "latency": latency
-                    }
-                }
-
-
-
-            prompt = f"""
+
+# RAG PROMPT
+# -----------------------------
+def build_rag_prompt(context: str, query: str) -> str:
+    return f"""
 You are a professional banking assistant.
 
 Use the CONTEXT below as a reference when it is relevant.
@@ -418,59 +282,324 @@ CONTEXT:
 {context}
 
 USER QUESTION:
-{final_query}
+{query}
 """
 
-            answer = groq_chat(session_id, prompt)
-            answer = clean_response(answer)
 
-            similarity = cosine_similarity(
-                embedder.encode(answer),
-                embedder.encode(context)
-            )
+# CHATBOT ENDPOINT
+# -----------------------------
+async def plan_reply(session_id: str, message: str, image: UploadFile | None) -> dict:
+    """
+    Run routing and retrieval for one turn.
+
+    Returns either a finished {"reply", ...} payload (precomputed answers) or a
+    {"prompt", "decision", "trace", ...} plan that still needs the LLM call;
+    the plan's trace is finished once the answer is ready.
+    """
+    trace = tracing.start_trace()
+    image_data = None
+
+    # IMAGE UPLOAD (decoded in memory, never written to a shared directory)
+    if image:
+        with trace.stage("upload"):
+            image_data = await read_upload(image)
 
-            faithfulness = 1 if similarity >= FAITHFULNESS_THRESHOLD else 0
+    raw_query = (message or "").strip()
+    with trace.stage("normalization"):
+        normalized_query = normalize_text(raw_query)
 
-            return {
-                "reply": answer,
-                "metrics": {
-                    "used_rag": True,
-                    "faithfulness": faithfulness,
-                    "latency": latency
-                }
-            }
+    intent, score, detected_text, query_vec = await detect_intent_async(
+        query=normalized_query if normalized_query else None,
+        image=image_data
+    )
+
+    final_query = normalized_query
+
+    # One pass over the compiled hint matcher: which banking areas matched
+    categories = banking_categories(final_query)
+    decision = decide_route(final_query, intent, score, categories, has_image=bool(image))
+
+        # ---------------- PRECOMPUTED (POLICY / SMALL TALK) ----------------
+    if decision.route == ROUTE_PRECOMPUTED:
+        reply, follow_up = precomputed_reply(decision, final_query)
 
-        #  Case 2: General banking → LLM ONLY
-        reply = clean_response(groq_chat(session_id, final_query))
         return {
             "reply": reply,
-            "metrics": {
-                "used_rag": False,
-                "latency": latency
-            }
+            "follow_up": follow_up,
+            "metrics": finish_metrics(trace, decision, {"used_rag": False})
         }
 
-    # ---------------- CONVERSATIONAL ----------------
-    if final_query:
-       reply = clean_response(groq_chat(session_id, final_query))
-       return {
-            "reply": reply,
+    llm_only = {
+        "prompt": final_query,
+        "decision": decision,
+        "trace": trace,
+        "metrics": {
+            "used_rag": False,
+            "categories": decision.categories
+        }
+    }
+
+        # ---------------- CONVERSATIONAL / GENERAL BANKING → LLM ONLY ----------------
+    if decision.route == ROUTE_LLM_ONLY:
+        return llm_only
+
+        # ---------------- HIGH-CONFIDENCE INTENT → THE INTENT'S LIVE CHUNKS ----------------
+    if decision.route == ROUTE_INTENT:
+        hits = await asyncio.to_thread(intent_hits, decision.intent, intent_centroid(decision.intent))
+        if not hits:
+            return {**llm_only, "decision": replace(decision, route=ROUTE_LLM_ONLY, reason="no_context")}
+
+        with trace.stage("context_packing"):
+            packed = await asyncio.to_thread(pack_hits, hits, query_vec)
+
+        return {
+            "prompt": build_rag_prompt(packed.text, final_query),
+            "context": packed.text,
+            "hits": packed.hits,
+            "decision": decision,
+            "trace": trace,
             "metrics": {
                 "used_rag": False,
-                "latency": latency
+                "categories": decision.categories,
+                "context_source": "intent_chunks",
+                "context_tokens": packed.tokens,
+                "context_tokens_saved": packed.tokens_saved
             }
-        }   
+        }
 
-    # ---------------- FALLBACK ----------------
-    reply = clean_response(groq_chat(session_id, final_query or "hello"))
-    return {
-        "reply": reply,
+        # ---------------- BANKING QUERIES → RAG ----------------
+    # Text queries reuse the vector intent detection already computed
+    known_vec = query_vec if detected_text == final_query else None
+    # Retrieval (embedding, vector store, graph) runs off the event loop
+    hits, query_vec = await asyncio.to_thread(
+        rag_retrieve_with_vector, final_query, CONTEXT_CANDIDATES, query_vec=known_vec
+    )
+    hits = hits or []
+
+    # Merge overlapping chunks, pick by MMR, stop at the token budget
+    with trace.stage("context_packing"):
+        packed = await asyncio.to_thread(pack_hits, hits, query_vec) if hits else None
+
+    context = packed.text if packed else ""
+    hits = packed.hits if packed else []
+
+    # Banking-related question without usable context → LLM should answer
+    if not context or len(context.strip()) < 50:
+        return {**llm_only, "decision": replace(decision, route=ROUTE_LLM_ONLY, reason="no_context")}
+
+    prompt = build_rag_prompt(context, final_query)
+
+    plan = {
+        "prompt": prompt,
+        "context": context,
+        "hits": hits,
+        "decision": decision,
+        "trace": trace,
         "metrics": {
-            "used_rag": False,
-            "latency": latency
+            "used_rag": True,
+            "categories": decision.categories,
+            "context_tokens": packed.tokens,
+            "context_tokens_saved": packed.tokens_saved
         }
     }
 
+    # ---------------- SEMANTIC ANSWER CACHE ----------------
+    if ANSWER_CACHE is not None:
+        chunk_ids = [hit["chunk_id"] for hit in hits]
+
+        cached = ANSWER_CACHE.lookup(query_vec, chunk_ids)
+        if cached is not None:
+            remember_turn(session_id, prompt, cached)
+            return {
+                "reply": cached,
+                "metrics": finish_metrics(
+                    trace, decision, {"used_rag": True, "cached": True}, route="answer_cache"
+                )
+            }
+
+        plan["cache_entry"] = (query_vec, chunk_ids)
+
+    return plan
+
+
+def finish_metrics(trace, decision: RouteDecision, metrics: dict, route: str | None = None) -> dict:
+    metrics.update(trace.finish(route or decision.route))
+    metrics["route_reason"] = decision.reason
+    log_decision(decision, metrics)
+    return metrics
+
+
+def cache_answer(plan: dict, answer: str, fallback: bool = False):
+    if fallback or answer == LLM_FALLBACK_REPLY:
+        return
+    if ANSWER_CACHE is not None and "cache_entry" in plan:
+        query_vec, chunk_ids = plan["cache_entry"]
+        ANSWER_CACHE.store(query_vec, chunk_ids, answer)
+
+
+# FAITHFULNESS (answer sentences vs. retrieved chunk vectors)
+# -----------------------------
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def chunk_matrix(hits: list) -> np.ndarray:
+    # Retrieval already holds the chunk vectors when RERANK_MODE=vectors;
+    # otherwise the chunk texts come straight from the embedding cache
+    if all(hit.get("vector") is not None for hit in hits):
+        return np.asarray([hit["vector"] for hit in hits], dtype=np.float32)
+    return encode_many([hit["text"] for hit in hits])
+
+
+def pack_hits(hits: list, query_vec):
+    return pack_context(hits, query_vec, chunk_matrix(hits))
+
+
+def faithfulness_score(answer: str, hits: list) -> float:
+    sentences = [s for s in _SENTENCE_SPLIT.split(answer.strip()) if s]
+    sentences = sentences[:FAITHFULNESS_MAX_SENTENCES]
+    if not sentences or not hits:
+        return 0.0
+
+    # Answers are rarely repeated, so keep them out of the embedding cache
+    answer_vecs = encode_many(sentences, use_cache=False)
+    chunks = chunk_matrix(hits)
+
+    answer_vecs /= np.maximum(np.linalg.norm(answer_vecs, axis=1, keepdims=True), 1e-12)
+    chunks = chunks / np.maximum(np.linalg.norm(chunks, axis=1, keepdims=True), 1e-12)
+
+    # Each sentence is judged by its best-supporting chunk
+    best = (answer_vecs @ chunks.T).max(axis=1)
+    return float(best.max() if FAITHFULNESS_AGG == "max" else best.mean())
+
+
+def log_faithfulness(answer: str, hits: list):
+    score = faithfulness_score(answer, hits)
+    status = "grounded" if score >= FAITHFULNESS_THRESHOLD else "ungrounded"
+    print(f"📊 Faithfulness {score:.3f} ({status})")
+
+
+async def reply_metrics(
+    plan: dict,
+    answer: str,
+    background_tasks: BackgroundTasks | None = None,
+    fallback: bool = False
+) -> dict:
+    metrics = dict(plan["metrics"])
+    trace = plan["trace"]
+
+    metrics["llm_fallback"] = fallback or answer == LLM_FALLBACK_REPLY
+
+    if plan.get("hits") and FAITHFULNESS_MODE == "inline":
+        with trace.stage("faithfulness"):
+            score = await asyncio.to_thread(faithfulness_score, answer, plan["hits"])
+        metrics["faithfulness"] = 1 if score >= FAITHFULNESS_THRESHOLD else 0
+        metrics["faithfulness_score"] = round(score, 3)
+
+    elif plan.get("hits") and FAITHFULNESS_MODE == "background" and background_tasks is not None:
+        background_tasks.add_task(log_faithfulness, answer, plan["hits"])
+
+    return finish_metrics(trace, plan["decision"], metrics)
+
+
+@app.post("/chatbot/ask")
+async def chatbot(
+    background_tasks: BackgroundTasks,
+    session_id: str = Form(...),
+    message: str = Form(""),
+    image: UploadFile = File(None)
+):
+    plan = await plan_reply(session_id, message, image)
+    if "reply" in plan:
+        return plan
+
+    with plan["trace"].stage("llm"):
+        answer = clean_response(await groq_chat(session_id, plan["prompt"]))
+    cache_answer(plan, answer)
+
+    return {
+        "reply": answer,
+        "metrics": await reply_metrics(plan, answer, background_tasks)
+    }
+
+
+# STREAMING CHATBOT ENDPOINT (JSON lines)
+# -----------------------------
+def _frame(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+@app.post("/chatbot/ask/stream")
+async def chatbot_stream(
+    background_tasks: BackgroundTasks,
+    session_id: str = Form(...),
+    message: str = Form(""),
+    image: UploadFile = File(None)
+):
+    plan = await plan_reply(session_id, message, image)
+
+    async def frames():
+        if "reply" in plan:
+            yield _frame({"type": "token", "content": plan["reply"]})
+            yield _frame({
+                "type": "done",
+                "follow_up": plan.get("follow_up"),
+                "metrics": plan["metrics"]
+            })
+            return
+
+        # The generator runs outside the request context, so time it explicitly
+        trace = plan["trace"]
+        parts = []
+        outcome = {}
+        llm_start = trace.elapsed()
+        async for token in groq_chat_stream(session_id, plan["prompt"], outcome):
+            if not parts:
+                trace.record("llm_first_token", trace.elapsed() - llm_start)
+            parts.append(token)
+            yield _frame({"type": "token", "content": token})
+        trace.record("llm", trace.elapsed() - llm_start)
+
+        answer = clean_response("".join(parts))
+        cache_answer(plan, answer, outcome["fallback"])
+        yield _frame({
+            "type": "done",
+            "metrics": await reply_metrics(plan, answer, background_tasks, outcome["fallback"])
+        })
+
+    # Tasks added while streaming run once the last frame has been sent
+    return StreamingResponse(
+        frames(),
+        media_type="application/x-ndjson",
+        background=background_tasks
+    )
+
+
+@app.get("/chatbot/memory/stats")
+def memory_stats():
+    return SESSION_STORE.stats()
+
+
+@app.get("/chatbot/cache/stats")
+def cache_stats():
+    stats = {"rag_search": search_cache_stats(), "ocr": ocr_cache_stats()}
+    if ANSWER_CACHE is not None:
+        stats["answers"] = ANSWER_CACHE.stats()
+    return stats
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(
+        tracing.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_clients()
+    shutdown_ocr_pool()
+
 
 # UI
 # -----------------------------
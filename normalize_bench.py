@@ -0,0 +1,96 @@
+import json
+import re
+import time
+
+from spellchecker import SpellChecker
+
+import text_utils
+from text_utils import PROTECTED_TERMS, load_domain_vocabulary, normalize_text
+
+EVAL_FILE = "eval_questions.json"
+ROUNDS = 20
+
+# Typos users actually make, applied where a question contains the word
+COMMON_MISSPELLINGS = {
+    "account": "acount", "accounts": "acounts", "transfer": "tranfer",
+    "money": "mony", "documents": "documnets", "required": "requried",
+    "applicable": "aplicable", "transactions": "transactons", "open": "opne",
+    "block": "blok", "card": "crad", "minimum": "minimun", "maximum": "maximun",
+    "amount": "ammount", "business": "buisness", "collateral": "colateral",
+    "customer": "cusotmer", "employee": "employe", "appraisal": "apraisal",
+    "policy": "polcy", "online": "onlien", "offline": "oflline",
+    "types": "tpyes", "offer": "ofer", "bank": "bnak", "richest": "richset",
+    "internal": "interal", "pay": "pya", "bill": "bil", "using": "usign",
+}
+
+# -----------------------------
+# Baseline (previous word-by-word implementation, same vocabulary)
+# -----------------------------
+baseline_spell = SpellChecker()
+baseline_spell.word_frequency.load_words(PROTECTED_TERMS)
+load_domain_vocabulary(checker=baseline_spell)
+
+def baseline_normalize(text: str) -> str:
+    if not text:
+        return ""
+
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+
+    corrected_words = []
+    for word in text.split():
+        if word in PROTECTED_TERMS:
+            corrected_words.append(word)
+        elif word.isalpha() and len(word) > 2:
+            corrected_words.append(baseline_spell.correction(word) or word)
+        else:
+            corrected_words.append(word)
+
+    return " ".join(corrected_words)
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+def time_rounds(fn, questions, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for q in questions:
+            fn(q)
+    return (time.perf_counter() - start) / (rounds * len(questions))
+
+
+def misspell(question: str):
+    """The question with every known typo applied, or None if it has none."""
+    words = question.split()
+    changed = False
+    for i, word in enumerate(words):
+        typo = COMMON_MISSPELLINGS.get(word.lower().strip("?.,!"))
+        if typo and typo not in baseline_spell:
+            words[i] = word.lower().replace(word.lower().strip("?.,!"), typo)
+            changed = True
+    return " ".join(words) if changed else None
+
+
+def run_benchmark():
+    with open(EVAL_FILE, "r") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    # Add a misspelt copy of each question so the slow path is exercised
+    misspelt = [m for m in map(misspell, questions) if m]
+    questions += misspelt
+
+    text_utils.correct_word.cache_clear()
+    cold = time_rounds(normalize_text, questions, 1)
+    warm = time_rounds(normalize_text, questions, ROUNDS)
+    baseline = time_rounds(baseline_normalize, questions, ROUNDS)
+
+    print(f"\n⏱️ normalize_text benchmark ({len(questions)} queries, {len(misspelt)} misspelt)\n")
+    print(f"Baseline:      {baseline * 1000:.3f} ms/query")
+    print(f"Engine (cold): {cold * 1000:.3f} ms/query")
+    print(f"Engine (warm): {warm * 1000:.3f} ms/query")
+    print(f"Speed-up:      {baseline / cold:.1f}x cold, {baseline / warm:.1f}x warm")
+    print(f"Cache:         {text_utils.correct_word.cache_info()}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,10 +1,165 @@
-from PIL import Image
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, Optional, Union
+
+from PIL import Image, ImageOps
 import pytesseract
 
+from services.ttl_cache import TTLCache
+
+
+pytesseract.pytesseract.tesseract_cmd = os.getenv(
+    "TESSERACT_CMD", r"Your-\Tesseract-OCR\tesseract.exe"
+)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", "2"))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "15"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))   # px, longest side
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "512"))
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", "86400"))
+
+# --------------------------------------------------
+# PREPROCESSING (downscale -> grayscale -> binarise)
+# --------------------------------------------------
+def _otsu_threshold(histogram) -> int:
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+
+    sum_bg = weight_bg = 0
+    best_t, best_var = 127, 0.0
+    for t, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+
+        sum_bg += t * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best_t, best_var = t, var
+
+    return best_t
+
 
-pytesseract.pytesseract.tesseract_cmd = r"Your-\Tesseract-OCR\tesseract.exe"
+def preprocess_image(image: Image.Image) -> Image.Image:
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE))
 
-def extract_text_from_image(image_path: str) -> str:
-    image = Image.open(image_path)
-    text = pytesseract.image_to_string(image)
+    gray = ImageOps.autocontrast(ImageOps.grayscale(image))
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point(lambda p: 255 if p > threshold else 0, mode="1")
+
+
+ImageSource = Union[str, bytes, BinaryIO]
+
+
+def extract_text_from_image(image_path: ImageSource, timeout: float = 0) -> str:
+    """
+    OCR an image given as a file path, raw bytes or a binary file object.
+    A non-zero `timeout` kills the Tesseract subprocess (RuntimeError).
+    """
+    if isinstance(image_path, (bytes, bytearray, memoryview)):
+        image_path = io.BytesIO(image_path)
+
+    image = preprocess_image(Image.open(image_path))
+    text = pytesseract.image_to_string(image, timeout=timeout)
     return text.strip()
+
+
+def _content_hash(source: bytes) -> str:
+    return hashlib.sha256(source).hexdigest()
+
+# --------------------------------------------------
+# ASYNC OCR (bounded process pool + content-hash cache)
+# --------------------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+_cache = TTLCache(OCR_CACHE_SIZE, OCR_CACHE_TTL)
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: the server process holds the model, DB
+        # connections and HTTP clients, and workers need only PIL + tesseract
+        _pool = ProcessPoolExecutor(
+            max_workers=OCR_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def _reset_pool():
+    # A crashed worker breaks the whole executor; start a fresh one next time
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _await_job(job: asyncio.Future, timeout: float) -> Optional[str]:
+    """Result of an OCR job, or None when it timed out or failed."""
+    try:
+        return await asyncio.wait_for(asyncio.shield(job), timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ OCR timed out after {timeout}s")
+    except BrokenProcessPool:
+        print("⚠️ OCR worker crashed; restarting the pool")
+        _reset_pool()
+    except RuntimeError as e:
+        # pytesseract's own timeout, raised after it killed the subprocess
+        print(f"⚠️ OCR failed: {e}")
+    return None
+
+
+async def extract_text_async(source: bytes, timeout: float = OCR_TIMEOUT) -> str:
+    """OCR uploaded image bytes off the event loop; identical images are OCR'd once."""
+    digest = _content_hash(source)
+
+    cached = _cache.get(digest)
+    if cached is not None:
+        return cached
+
+    # Same image already being processed -> wait for that job (same deadline)
+    if digest in _inflight:
+        text = await _await_job(_inflight[digest], timeout)
+        return text if text is not None else ""
+
+    loop = asyncio.get_running_loop()
+    try:
+        job = loop.run_in_executor(_get_pool(), extract_text_from_image, source, timeout)
+    except BrokenProcessPool:
+        _reset_pool()
+        return ""
+    _inflight[digest] = job
+
+    try:
+        text = await _await_job(job, timeout)
+    finally:
+        _inflight.pop(digest, None)
+
+    if text is None:
+        return ""
+
+    _cache.set(digest, text)
+    return text
+
+
+def ocr_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def shutdown_ocr_pool():
+    _reset_pool()
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, List, Optional
+
+from keyword_router import CONTACT_UPDATE_MATCHER, RAG_TRIGGER_MATCHER, smalltalk_kind
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+ROUTE_PRECOMPUTED = "precomputed"
+ROUTE_LLM_ONLY = "llm_only"
+ROUTE_RAG = "rag"
+ROUTE_INTENT = "intent"
+
+# Intent matches at least this close are answered from the indexed chunks
+# nearest the intent, skipping query embedding search, BM25 and the graph
+ROUTE_INTENT_MIN_SCORE = float(os.getenv("ROUTE_INTENT_MIN_SCORE", "0.7"))
+
+# Banking-hinted queries that resemble no intent at least this closely
+# skip retrieval and go to the LLM with general banking knowledge
+ROUTE_RAG_MIN_SCORE = float(os.getenv("ROUTE_RAG_MIN_SCORE", "0.3"))
+
+# One JSON line per answered request; opt-in, e.g. .cache/route_decisions.jsonl
+ROUTE_LOG_PATH = os.getenv("ROUTE_LOG_PATH", "")
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    reason: str
+    intent: Optional[str] = None
+    score: float = 0.0
+    categories: List[str] = field(default_factory=list)
+
+# --------------------------------------------------
+# ROUTING (cheapest path that can answer the query)
+# --------------------------------------------------
+def decide_route(
+    query: str,
+    intent: Optional[str],
+    score: float,
+    categories: Iterable[str],
+    has_image: bool = False,
+    rag_min_score: float = ROUTE_RAG_MIN_SCORE,
+    intent_min_score: float = ROUTE_INTENT_MIN_SCORE
+) -> RouteDecision:
+    """
+    precomputed -> empty message, contact-update policy, small talk
+    intent      -> intent matched with score >= intent_min_score
+    rag         -> image, weaker intent match, explicit RAG trigger, or a
+                   banking-hinted query scoring >= rag_min_score
+    llm_only    -> everything else
+    """
+    decision = RouteDecision(
+        ROUTE_LLM_ONLY, "conversational", intent, round(float(score), 4), sorted(categories)
+    )
+
+    if not query and not has_image:
+        decision.route, decision.reason = ROUTE_PRECOMPUTED, "empty"
+    elif query and CONTACT_UPDATE_MATCHER.matches(query):
+        decision.route, decision.reason = ROUTE_PRECOMPUTED, "contact_update"
+    elif query and smalltalk_kind(query):
+        decision.route, decision.reason = ROUTE_PRECOMPUTED, smalltalk_kind(query)
+    elif has_image:
+        decision.route, decision.reason = ROUTE_RAG, "image"
+    elif intent is not None and score >= intent_min_score:
+        decision.route, decision.reason = ROUTE_INTENT, "intent_match"
+    elif intent is not None:
+        decision.route, decision.reason = ROUTE_RAG, "intent"
+    elif RAG_TRIGGER_MATCHER.matches(query):
+        decision.route, decision.reason = ROUTE_RAG, "rag_trigger"
+    elif decision.categories and score >= rag_min_score:
+        decision.route, decision.reason = ROUTE_RAG, "banking_category"
+    elif decision.categories:
+        decision.reason = "weak_banking"
+
+    return decision
+
+# --------------------------------------------------
+# DECISION LOG (JSON lines, no message text)
+# --------------------------------------------------
+_log_lock = threading.Lock()
+
+
+def log_decision(decision: RouteDecision, metrics: dict):
+    if not ROUTE_LOG_PATH:
+        return
+
+    record = {
+        "ts": round(time.time(), 3),
+        **asdict(decision),
+        "served_by": metrics.get("route"),
+        "latency": metrics.get("latency"),
+        "stages_ms": metrics.get("stages_ms", {}),
+    }
+
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(ROUTE_LOG_PATH) or ".", exist_ok=True)
+            with open(ROUTE_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Route log write failed: {e}")
@@ -1,15 +1,22 @@
+import hashlib
+import json
 import os
+import threading
+import time
 import uuid
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from dotenv import load_dotenv
 
-from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as rest
 from neo4j import GraphDatabase
 
-from langchain_community.document_loaders import UnstructuredFileLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from services.embedding_service import embedding_dim, encode_many
+from services import tracing
+from services.ttl_cache import TTLCache
+from vector_store import VectorPoint, create_vector_store
+
+from doc_chunker import load_chunks
+from lexical_index import create_lexical_index
 import numpy as np
 
 # --------------------------------------------------
@@ -21,14 +28,45 @@ load_dotenv()
 # CONFIG
 # --------------------------------------------------
 COLLECTION = "banking_rag"
-EMBED_DIM = 384
+
+# Vector size of the collection; taken from EMBED_MODEL unless set explicitly
+EMBED_DIM = int(os.getenv("EMBED_DIM", "0")) or embedding_dim()
 
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
 
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+# Record of which chunks of which documents are in the index
+MANIFEST_PATH = os.getenv("RAG_MANIFEST_PATH", "rag_manifest.json")
+
+# Chunks embedded + upserted per round trip during indexing
+INDEX_BATCH_SIZE = int(os.getenv("RAG_INDEX_BATCH_SIZE", "256"))
+
+# rag_search result cache (keyed on normalised query, top_k, index version)
+SEARCH_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "3600"))
+
+# "vectors" -> re-rank on the stored vectors the store returns (with_vectors=True)
+# "score"   -> trust the cosine score the vector store already computed
+RERANK_MODE = os.getenv("RAG_RERANK_MODE", "vectors")
+
+# Fuse BM25 (lexical) and dense rankings with reciprocal-rank fusion
+HYBRID_SEARCH = os.getenv("RAG_HYBRID", "1") == "1"
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+# Candidates fetched from each retriever, as a multiple of top_k
+# (hybrid when the BM25 index has chunks, dense-only otherwise, e.g. before
+# a deployment has re-ingested)
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("RAG_CANDIDATE_FACTOR", "2"))
+DENSE_CANDIDATE_FACTOR = int(os.getenv("RAG_DENSE_CANDIDATE_FACTOR", "4"))
+
+# Live chunks kept per intent for the high-confidence intent route
+INTENT_CONTEXT_CHUNKS = int(os.getenv("RAG_INTENT_CONTEXT_CHUNKS", "8"))
+
+# Added to the semantic score in proportion to the share of query
+# entities a chunk MENTIONS in the graph
+GRAPH_WEIGHT = float(os.getenv("RAG_GRAPH_WEIGHT", "0.1"))
 
 # --------------------------------------------------
 # MODE FLAGS
@@ -36,18 +74,12 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 GRAPH_AVAILABLE = True
 
 # --------------------------------------------------
-# EMBEDDING MODEL
+# VECTOR STORE (backend chosen by VECTOR_BACKEND)
 # --------------------------------------------------
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+vector_store = create_vector_store(COLLECTION, EMBED_DIM)
 
-# --------------------------------------------------
-# QDRANT CLIENT
-# --------------------------------------------------
-qdrant_client = QdrantClient(
-    url="Your QDRANT_URL ",
-    api_key=QDRANT_API_KEY,
-    check_compatibility=False
-)
+# BM25 over the same chunks, kept in sync by index_chunks
+lexical_index = create_lexical_index(COLLECTION)
 
 # --------------------------------------------------
 # NEO4J DRIVER
@@ -78,65 +110,316 @@ def extract_entities(text: str) -> List[str]:
     return list({k for k in keywords if k in text.lower()})
 
 # --------------------------------------------------
-# BUILD RAG INDEX
+# GRAPH WRITES (batched, one transaction)
 # --------------------------------------------------
-def build_rag_index(source_file: str):
-    loader = UnstructuredFileLoader(source_file)
-    docs = loader.load()
+GRAPH_BATCH_SIZE = 1000
 
-    # chunks 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=300,
-        chunk_overlap=50
-    )
 
-    chunks = splitter.split_documents(docs)
-    texts = [c.page_content.strip() for c in chunks]
+def ensure_graph_schema():
+    # Uniqueness constraints also create the backing lookup indexes
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        session.run(
+            "CREATE CONSTRAINT chunk_id IF NOT EXISTS "
+            "FOR (c:Chunk) REQUIRE c.id IS UNIQUE"
+        )
+        session.run(
+            "CREATE CONSTRAINT entity_name IF NOT EXISTS "
+            "FOR (e:Entity) REQUIRE e.name IS UNIQUE"
+        )
+
+
+def _write_graph_tx(tx, rows):
+    nodes = edges = 0
+
+    for start in range(0, len(rows), GRAPH_BATCH_SIZE):
+        batch = rows[start:start + GRAPH_BATCH_SIZE]
+
+        summary = tx.run(
+            """
+            UNWIND $rows AS row
+            MERGE (c:Chunk {id: row.id})
+            SET c.text = row.text
+            """,
+            rows=batch
+        ).consume()
+        nodes += summary.counters.nodes_created
+
+        summary = tx.run(
+            """
+            UNWIND $rows AS row
+            MATCH (c:Chunk {id: row.id})
+            WITH c, row
+            UNWIND row.entities AS name
+            MERGE (e:Entity {name: name})
+            MERGE (c)-[:MENTIONS]->(e)
+            """,
+            rows=batch
+        ).consume()
+        nodes += summary.counters.nodes_created
+        edges += summary.counters.relationships_created
+
+    return nodes, edges
+
+
+def write_graph(rows) -> bool:
+    """
+    rows: [{"id": chunk_id, "text": text, "entities": [...]}, ...]
+    False only when the write failed (no graph configured counts as done).
+    """
+    if not (neo4j_driver and GRAPH_AVAILABLE) or not rows:
+        return True
+
+    try:
+        ensure_graph_schema()
+        with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+            nodes, edges = session.execute_write(_write_graph_tx, rows)
+    except Exception as e:
+        print(f"⚠️ Graph write failed: {e}")
+        return False
+
+    print(f"✅ Graph updated: {nodes} nodes, {edges} MENTIONS edges created")
+    return True
+
+def _graph_row(chunk_id: str, text: str) -> dict:
+    return {"id": chunk_id, "text": text, "entities": extract_entities(text)}
+
+
+def delete_graph_chunks(chunk_ids: List[str]):
+    if not (neo4j_driver and GRAPH_AVAILABLE) or not chunk_ids:
+        return
+
+    try:
+        with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $ids AS id
+                    MATCH (c:Chunk {id: id})
+                    DETACH DELETE c
+                    """,
+                    ids=chunk_ids
+                ).consume()
+            )
+    except Exception as e:
+        print(f"⚠️ Graph delete failed: {e}")
+
+# --------------------------------------------------
+# CHUNK IDS & INDEX MANIFEST
+# --------------------------------------------------
+def source_key(source_file: str) -> str:
+    return os.path.abspath(source_file)
+
+
+def chunk_hash(source: str, text: str) -> str:
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def point_id(chunk_id: str) -> str:
+    # Qdrant ids must be unsigned ints or UUIDs; derive a stable UUID
+    return str(uuid.UUID(hex=chunk_id[:32]))
+
+
+def load_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {"version": 0, "documents": {}}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_version_state = {"mtime": None, "version": 0}
+
+
+def index_version() -> int:
+    """Manifest version, re-read only when the file changes on disk."""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+    if mtime != _version_state["mtime"]:
+        _version_state["version"] = load_manifest().get("version", 0)
+        _version_state["mtime"] = mtime
+    return _version_state["version"]
 
-    vectors = embedder.encode(texts, batch_size=32)
+
+def save_manifest(manifest: dict):
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+# --------------------------------------------------
+# BUILD RAG INDEX (incremental, batched)
+# --------------------------------------------------
+def _index_batch(source: str, batch: List[tuple]) -> bool:
+    """
+    batch: [(chunk_id, chunk_dict), ...] -> embed, graph write, upsert.
+    Returns whether the graph write succeeded.
+    """
+    vectors = encode_many([chunk["text"] for _, chunk in batch])
 
     points = []
+    graph_rows = []
 
-    for i, text in enumerate(texts):
-        chunk_id = str(uuid.uuid4())
-        entities = extract_entities(text)
-
-        # ---------- Graph Write ----------
-        if neo4j_driver and GRAPH_AVAILABLE:
-            try:
-                with neo4j_driver.session(database=NEO4J_DATABASE) as session:
-                    session.run(
-                        "CREATE (c:Chunk {id:$id, text:$text})",
-                        id=chunk_id,
-                        text=text
-                    )
-                    for ent in entities:
-                        session.run(
-                            """
-                            MERGE (e:Entity {name:$name})
-                            MATCH (c:Chunk {id:$cid})
-                            MERGE (c)-[:MENTIONS]->(e)
-                            """,
-                            name=ent,
-                            cid=chunk_id
-                        )
-            except Exception:
-                pass
+    for (chunk_id, chunk), vector in zip(batch, vectors):
+        text = chunk["text"]
+        row = _graph_row(chunk_id, text)
+        entities = row["entities"]
+
+        graph_rows.append(row)
 
         points.append(
-            rest.PointStruct(
-                id=i,
-                vector=vectors[i].tolist(),
+            VectorPoint(
+                id=point_id(chunk_id),
+                vector=vector.tolist(),
                 payload={
                     "chunk_id": chunk_id,
+                    "source": source,
+                    "source_file": chunk.get("source_file"),
+                    "section": chunk.get("section"),
+                    "page": chunk.get("page"),
                     "text": text,
                     "entities": entities
                 }
             )
         )
 
-    qdrant_client.upsert(collection_name=COLLECTION, points=points)
-    print("✅ Vector RAG index built successfully!")
+    # ---------- Graph Write ----------
+    graph_ok = write_graph(graph_rows)
+
+    vector_store.upsert(points)
+    return graph_ok
+
+
+def _delete_chunks(chunk_ids: List[str], batch_size: int):
+    for start in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[start:start + batch_size]
+        vector_store.delete([point_id(cid) for cid in batch])
+        delete_graph_chunks(batch)
+
+
+def purge_unmanifested(manifest: dict) -> int:
+    """
+    Delete vector points and graph Chunk nodes that no manifest entry owns,
+    e.g. the integer-id points and uuid4 Chunk nodes of the old full rebuild.
+    """
+    keep = {cid for entry in manifest["documents"].values() for cid in entry["chunks"]}
+    keep_points = {point_id(cid) for cid in keep}
+
+    orphans = [pid for pid in vector_store.ids() if str(pid) not in keep_points]
+    for start in range(0, len(orphans), INDEX_BATCH_SIZE):
+        vector_store.delete(orphans[start:start + INDEX_BATCH_SIZE])
+
+    if neo4j_driver and GRAPH_AVAILABLE:
+        with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    MATCH (c:Chunk)
+                    WHERE NOT c.id IN $keep
+                    DETACH DELETE c
+                    """,
+                    keep=sorted(keep)
+                ).consume()
+            )
+
+    if orphans:
+        print(f"🗑️ Purged {len(orphans)} vector points not in the manifest")
+    return len(orphans)
+
+
+def index_chunks(source_file: str, chunks: List[dict], batch_size: int = INDEX_BATCH_SIZE) -> dict:
+    """Sync one document's chunks into the index (only the diff is written)."""
+    source = source_key(source_file)
+
+    # Same text twice in one document -> one chunk
+    current = {}
+    for chunk in chunks:
+        current.setdefault(chunk_hash(source, chunk["text"]), chunk)
+
+    manifest = load_manifest()
+
+    # ---------- One-time purge of points indexed before the manifest ----------
+    if not manifest.get("purged_unmanifested"):
+        if purge_unmanifested(manifest):
+            manifest["version"] = manifest.get("version", 0) + 1
+        manifest["purged_unmanifested"] = True
+        save_manifest(manifest)
+
+    entry = manifest["documents"].get(source, {})
+    previous = set(entry.get("chunks", []))
+
+    new_ids = [cid for cid in current if cid not in previous]
+    stale_ids = sorted(previous - current.keys())
+
+    # ---------- Retry graph writes that failed on an earlier run ----------
+    retry_ids = [cid for cid in entry.get("graph_pending", []) if cid in current]
+    graph_pending = []
+    if retry_ids and not write_graph([_graph_row(cid, current[cid]["text"]) for cid in retry_ids]):
+        graph_pending.extend(retry_ids)
+
+    # ---------- Add new / changed chunks ----------
+    for start in range(0, len(new_ids), batch_size):
+        batch = new_ids[start:start + batch_size]
+        if not _index_batch(source, [(cid, current[cid]) for cid in batch]):
+            graph_pending.extend(batch)
+
+    # ---------- Remove stale chunks ----------
+    _delete_chunks(stale_ids, batch_size)
+
+    # ---------- Lexical index (also backfills chunks indexed before it existed) ----------
+    missing = [cid for cid in current if cid not in lexical_index]
+    if missing or stale_ids:
+        lexical_index.update(
+            add={cid: current[cid]["text"] for cid in missing},
+            remove=stale_ids
+        )
+
+    # Chunks whose graph write failed stay listed so the next run retries them
+    if new_ids or stale_ids or graph_pending != entry.get("graph_pending", []):
+        manifest["version"] = manifest.get("version", 0) + 1
+        manifest["documents"][source] = {
+            "chunks": list(current),
+            "indexed_at": time.time()
+        }
+        if graph_pending:
+            manifest["documents"][source]["graph_pending"] = graph_pending
+        save_manifest(manifest)
+
+    return {
+        "added": len(new_ids),
+        "removed": len(stale_ids),
+        "unchanged": len(current) - len(new_ids),
+        "graph_pending": len(graph_pending),
+    }
+
+
+def remove_document(source_file: str) -> int:
+    """Drop every chunk of a document that no longer exists."""
+    source = source_key(source_file)
+    manifest = load_manifest()
+    entry = manifest["documents"].pop(source, None)
+    if not entry:
+        return 0
+
+    _delete_chunks(entry["chunks"], INDEX_BATCH_SIZE)
+    lexical_index.update(remove=entry["chunks"])
+    manifest["version"] = manifest.get("version", 0) + 1
+    save_manifest(manifest)
+    return len(entry["chunks"])
+
+
+def build_rag_index(source_file: str):
+    stats = index_chunks(source_file, load_chunks(source_file))
+
+    print(
+        f"✅ Vector RAG index updated for {os.path.basename(source_file)}: "
+        f"{stats['added']} added, {stats['removed']} removed, "
+        f"{stats['unchanged']} unchanged"
+    )
+    if stats["graph_pending"]:
+        print(f"⚠️ {stats['graph_pending']} chunks missing from the graph; retried on the next run")
+    return stats
 
 # --------------------------------------------------
 # COSINE SIMILARITY
@@ -144,61 +427,246 @@ def build_rag_index(source_file: str):
 def cosine_similarity(a, b):
     return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
 
+
+def cosine_scores(query_vec, doc_matrix) -> np.ndarray:
+    """Cosine similarity of one query vector against every row of a matrix."""
+    query_vec = np.asarray(query_vec, dtype=np.float32)
+    doc_matrix = np.asarray(doc_matrix, dtype=np.float32)
+
+    q_norm = np.linalg.norm(query_vec)
+    d_norms = np.linalg.norm(doc_matrix, axis=1)
+    denom = d_norms * q_norm
+    denom[denom == 0] = 1.0
+
+    return (doc_matrix @ query_vec) / denom
+
 # --------------------------------------------------
-# RAG SEARCH (VECTOR + GRAPH + RE-RANKING)
+# GRAPH BOOST LOOKUP (one round trip for all query entities)
 # --------------------------------------------------
-def rag_search(query: str, top_k: int = 4):
-    MIN_SCORE = 0.18  # MiniLM-friendly
+_graph_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="graph-boost")
+
+
+def graph_mentions(entities: List[str]) -> Dict[str, int]:
+    """chunk_id -> number of the given entities the chunk mentions."""
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        res = session.run(
+            """
+            UNWIND $entities AS name
+            MATCH (c:Chunk)-[:MENTIONS]->(:Entity {name: name})
+            RETURN c.id AS id, count(*) AS mentions
+            """,
+            entities=entities
+        )
+        return {r["id"]: r["mentions"] for r in res}
 
-    query_vec = embedder.encode(query)
+# --------------------------------------------------
+# INTENT CONTEXT (live chunks nearest each intent, per index version)
+# --------------------------------------------------
+_intent_chunks = {"version": None, "ids": {}}
+_intent_lock = threading.Lock()
+
+
+def intent_hits(intent: str, centroid, limit: int = INTENT_CONTEXT_CHUNKS) -> List[dict]:
+    """
+    Indexed chunks nearest an intent's centroid, as hits with vectors.
+    Their chunk ids are searched once per index version; after that the
+    chunks are fetched by id, with no query embedding, BM25 or graph lookup.
+    """
+    version = index_version()
+    with _intent_lock:
+        if _intent_chunks["version"] != version:
+            _intent_chunks.update(version=version, ids={})
+        ids = _intent_chunks["ids"].get(intent)
+
+    if ids is None:
+        with tracing.stage("intent_chunk_search"):
+            ids = [p.id for p in vector_store.search(centroid, limit=limit)]
+        with _intent_lock:
+            if _intent_chunks["version"] == version:
+                _intent_chunks["ids"][intent] = ids
+
+    with tracing.stage("intent_chunk_fetch"):
+        points = {p.id: p for p in vector_store.retrieve(ids, with_vectors=True)}
+
+    return [
+        {
+            "chunk_id": points[pid].payload.get("chunk_id"),
+            "text": points[pid].payload["text"],
+            "vector": points[pid].vector
+        }
+        for pid in ids
+        if pid in points
+    ]
 
-    # ---------- Vector Retrieval ----------
-    search_results = qdrant_client.query_points(
-        collection_name=COLLECTION,
-        query=query_vec.tolist(),
-        limit=top_k * 4,
-        with_payload=True
-    )
+# --------------------------------------------------
+# STAGE TIMINGS (seconds, onto the caller's trace)
+# --------------------------------------------------
+def _publish_timings(timings: dict):
+    for stage, seconds in timings.items():
+        tracing.record(stage, seconds)
 
-    if not search_results or not search_results.points:
-        return None
+# --------------------------------------------------
+# RAG SEARCH CACHE
+# --------------------------------------------------
+_search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+_cached_version = {"version": None}
+_CACHE_MISS = object()
+
+
+def search_cache_stats() -> dict:
+    return {**_search_cache.stats(), "index_version": _cached_version["version"]}
+
+
+def rag_retrieve(query: str, top_k: int = 4):
+    """
+    Ranked hits as [{"chunk_id", "text", "score", "vector"}, ...], or None.
+    "vector" is the stored chunk vector (None when RAG_RERANK_MODE=score).
+    """
+    return rag_retrieve_with_vector(query, top_k)[0]
+
+
+def rag_retrieve_with_vector(query: str, top_k: int = 4, query_vec=None):
+    """
+    (hits, query vector): as rag_retrieve, plus the query embedding so callers
+    need not encode the query again. Pass `query_vec` if it is already known.
+    """
+    t0 = time.perf_counter()
+
+    # A new index version makes every cached result stale
+    version = index_version()
+    if version != _cached_version["version"]:
+        _search_cache.clear()
+        _cached_version["version"] = version
+
+    key = (" ".join(query.lower().split()), top_k, version)
+    cached = _search_cache.get(key, default=_CACHE_MISS)
+    if cached is not _CACHE_MISS:
+        hits, cached_vec = cached
+        _publish_timings({"rag_cache": time.perf_counter() - t0})
+        return (list(hits) if hits is not None else None), (
+            query_vec if query_vec is not None else cached_vec
+        )
 
-    # ---------- Semantic Re-ranking ----------
-    scored_chunks = []
-    for p in search_results.points:
-        doc_text = p.payload["text"]
-        doc_vec = embedder.encode(doc_text)
-        sim = cosine_similarity(query_vec, doc_vec)
-        if sim >= MIN_SCORE:
-            scored_chunks.append((sim, doc_text))
-
-    if not scored_chunks:
+    results, query_vec = _rag_retrieve_uncached(query, top_k, query_vec)
+    _search_cache.set(key, (tuple(results) if results is not None else None, query_vec))
+    return results, query_vec
+
+
+def rag_search(query: str, top_k: int = 4):
+    hits = rag_retrieve(query, top_k)
+    if hits is None:
         return None
+    return [hit["text"] for hit in hits]
+
+# --------------------------------------------------
+# RAG SEARCH (VECTOR + GRAPH + RE-RANKING)
+# --------------------------------------------------
+def _rag_retrieve_uncached(query: str, top_k: int = 4, query_vec=None):
+    """(ranked hits or None, query vector)."""
+    MIN_SCORE = 0.18  # MiniLM-friendly
 
-    scored_chunks.sort(reverse=True, key=lambda x: x[0])
+    timings = {}
 
-    # ---------- Graph Boost (optional) ----------
+    # ---------- Graph Lookup (runs alongside the vector query) ----------
     query_entities = extract_entities(query)
+    graph_future = None
     if neo4j_driver and GRAPH_AVAILABLE and query_entities:
+        graph_future = _graph_pool.submit(graph_mentions, query_entities)
+
+    if query_vec is None:
+        t0 = time.perf_counter()
+        query_vec = encode_many([query])[0]
+        timings["embedding"] = time.perf_counter() - t0
+
+    hybrid = HYBRID_SEARCH and len(lexical_index) > 0
+    n_candidates = top_k * (HYBRID_CANDIDATE_FACTOR if hybrid else DENSE_CANDIDATE_FACTOR)
+
+    # ---------- Vector Retrieval ----------
+    t0 = time.perf_counter()
+    points = vector_store.search(
+        query_vec,
+        limit=n_candidates,
+        with_vectors=RERANK_MODE == "vectors"
+    )
+    timings["vector_search"] = time.perf_counter() - t0
+    n_dense = len(points)
+
+    # ---------- Lexical Retrieval (BM25) ----------
+    lexical = []
+    if hybrid:
+        t0 = time.perf_counter()
+        lexical = lexical_index.search(query, n_candidates)
+
+        # Lexical-only candidates are fetched with vectors so they can be scored
+        dense_ids = {p.payload.get("chunk_id") for p in points}
+        extra_ids = [point_id(cid) for cid, _ in lexical if cid not in dense_ids]
+        if extra_ids:
+            points = points + vector_store.retrieve(extra_ids, with_vectors=True)
+        timings["lexical_search"] = time.perf_counter() - t0
+
+    if not points:
+        _publish_timings(timings)
+        return None, query_vec
+
+    # ---------- Semantic Re-ranking ----------
+    t0 = time.perf_counter()
+
+    if RERANK_MODE == "vectors":
+        sims = cosine_scores(query_vec, [p.vector for p in points])
+    else:
+        sims = np.zeros(len(points), dtype=np.float32)
+        sims[:n_dense] = [p.score for p in points[:n_dense]]
+        if len(points) > n_dense:
+            sims[n_dense:] = cosine_scores(query_vec, [p.vector for p in points[n_dense:]])
+
+    keep = np.flatnonzero(sims >= MIN_SCORE)
+    timings["rerank"] = time.perf_counter() - t0
+
+    if keep.size == 0:
+        _publish_timings(timings)
+        return None, query_vec
+
+    # ---------- Graph Boost (optional, blended into the score) ----------
+    t0 = time.perf_counter()
+    scores = sims[keep].astype(np.float32)
+    if graph_future is not None:
         try:
-            with neo4j_driver.session(database=NEO4J_DATABASE) as session:
-                graph_ids = set()
-                for ent in query_entities:
-                    res = session.run(
-                        """
-                        MATCH (c:Chunk)-[:MENTIONS]->(e:Entity {name:$name})
-                        RETURN c.id AS id
-                        """,
-                        name=ent
-                    )
-                    graph_ids.update(r["id"] for r in res)
-
-                scored_chunks = sorted(
-                    scored_chunks,
-                    key=lambda x: 1 if x[1] in graph_ids else 0,
-                    reverse=True
-                )
-        except Exception:
-            pass
-
-    return [text for _, text in scored_chunks[:top_k]]
+            mentions = graph_future.result()
+            boost = np.asarray(
+                [mentions.get(points[i].payload.get("chunk_id"), 0) for i in keep],
+                dtype=np.float32
+            )
+            scores += GRAPH_WEIGHT * boost / len(query_entities)
+        except Exception as e:
+            print(f"⚠️ Graph boost skipped: {e}")
+    timings["graph_boost"] = time.perf_counter() - t0
+
+    # ---------- Reciprocal-Rank Fusion (semantic + lexical) ----------
+    if lexical:
+        t0 = time.perf_counter()
+        lexical_rank = {cid: r for r, (cid, _) in enumerate(lexical)}
+
+        fused = np.zeros_like(scores)
+        fused[np.argsort(-scores, kind="stable")] = 1.0 / (RRF_K + 1 + np.arange(len(scores)))
+
+        lex = np.asarray(
+            [lexical_rank.get(points[i].payload.get("chunk_id"), -1) for i in keep]
+        )
+        fused += np.where(lex >= 0, 1.0 / (RRF_K + 1 + np.maximum(lex, 0)), 0.0)
+
+        scores = fused
+        timings["fusion"] = time.perf_counter() - t0
+
+    ranked = np.argsort(-scores, kind="stable")[:top_k]
+
+    _publish_timings(timings)
+    hits = [
+        {
+            "chunk_id": points[keep[r]].payload.get("chunk_id"),
+            "text": points[keep[r]].payload["text"],
+            "score": float(scores[r]),
+            "vector": points[keep[r]].vector
+        }
+        for r in ranked
+    ]
+    return hits, query_vec
@@ -1,167 +1,212 @@
+import argparse
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from rag_engine import rag_search, embedder
+from rag_engine import rag_search
+from services import tracing
+from services.embedding_service import encode_many
 
 EVAL_FILE = "eval_questions.json"
 TOP_K = 6
 SIM_THRESHOLD = 0.35
-
-EMBED_CACHE = {}
-
-def get_embedding(text):
-    if text not in EMBED_CACHE:
-        EMBED_CACHE[text] = embedder.encode(text)
-    return EMBED_CACHE[text]
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "8"))
 
 # -----------------------------
 # Utility Functions
 # -----------------------------
-def cosine_similarity(a, b):
-    if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
-        return 0.0
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-
-def dcg(scores):
-    return sum(score / np.log2(idx + 2) for idx, score in enumerate(scores))
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
 
 # -----------------------------
-# Evaluation Logic
+# Retrieval (bounded thread pool)
 # -----------------------------
-def evaluate_rag():
-    with open(EVAL_FILE, "r") as f:
-        eval_data = json.load(f)
+def retrieve_one(question):
+    trace = tracing.start_trace()
+    start_time = time.perf_counter()
+    docs = rag_search(question, top_k=TOP_K) or []
+    return docs, time.perf_counter() - start_time, dict(trace.stages)
 
-    total = len(eval_data)
+def retrieve_all(questions, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(retrieve_one, questions))
 
-    precision_scores, recall_scores = [], []
-    mrr_scores, ndcg_scores = [], []
+# -----------------------------
+# Embeddings (every unique text, one pass)
+# -----------------------------
+class TextMatrix:
+    def __init__(self, texts):
+        unique = list(dict.fromkeys(texts))
+        self.index = {text: i for i, text in enumerate(unique)}
+        self.vectors = normalize_rows(encode_many(unique)) if unique else np.zeros((0, 0))
+
+    def rows(self, texts):
+        return np.asarray([self.index[t] for t in texts], dtype=np.intp)
+
+def padded(groups, width):
+    """List of text lists -> (n, width) index matrix and validity mask."""
+    idx = np.zeros((len(groups), width), dtype=np.intp)
+    mask = np.zeros((len(groups), width), dtype=bool)
+    for i, group in enumerate(groups):
+        idx[i, :len(group)] = group
+        mask[i, :len(group)] = True
+    return idx, mask
 
-    faithfulness_hits = 0
-    relevance_hits = 0
-    coherence_hits = 0
-    fluency_hits = 0
+# -----------------------------
+# Vectorised Metrics
+# -----------------------------
+def retrieval_metrics(emb, docs, entities):
+    """Precision, recall, MRR and nDCG for every answered question at once."""
+    k = max(len(d) for d in docs)
+    m = max((len(e) for e in entities), default=0) or 1
 
-    hallucinations = 0
-    grounded_hits = 0
-    latencies = []
+    doc_idx, doc_mask = padded([emb.rows(d) for d in docs], k)
+    ent_idx, ent_mask = padded([emb.rows(e) for e in entities], m)
 
-    print("\n🔍 RAG EVALUATION STARTED\n")
+    # (n, k, m): each retrieved doc against each expected entity
+    sims = np.einsum("nkd,nmd->nkm", emb.vectors[doc_idx], emb.vectors[ent_idx])
+    hits = (sims >= SIM_THRESHOLD) & doc_mask[:, :, None] & ent_mask[:, None, :]
 
-    # =============================
-    # MAIN LOOP
-    # =============================
-    for idx, item in enumerate(eval_data, 1):
-        question = item["question"]
-        expected_entities = item["expected_entities"]
-        answer_expected = item["answer_expected"]
+    flags = hits.any(axis=2)
+    n_docs = doc_mask.sum(axis=1)
+    n_ents = ent_mask.sum(axis=1)
 
-        print(f"Q{idx}: {question}")
+    # A relevant doc is credited to the first entity it matches
+    first_entity = hits.argmax(axis=2)
+    matched = np.zeros_like(ent_mask)
+    rows, cols = np.nonzero(flags)
+    matched[rows, first_entity[rows, cols]] = True
 
-        # -----------------------------
-        # Retrieval + Latency
-        # -----------------------------
-        start_time = time.time()
-        retrieved_docs = rag_search(question, top_k=TOP_K) or []
-        latency = time.time() - start_time
-        latencies.append(latency)
+    precision = flags.sum(axis=1) / n_docs
+    recall = np.where(n_ents > 0, matched.sum(axis=1) / np.maximum(n_ents, 1), 0.0)
 
-        generated_answer = " ".join(retrieved_docs)
+    first_hit = flags.argmax(axis=1)
+    mrr = np.where(flags.any(axis=1), 1.0 / (first_hit + 1), 0.0)
 
-        # -----------------------------
-        # Fallback Handling
-        # -----------------------------
-        if not retrieved_docs:
-            if not answer_expected:
-                grounded_hits += 1
-                print("✅ Correct fallback (no context retrieved)")
-            else:
-                hallucinations += 1
-                print("❌ Missed retrieval (should have context)")
-
-            print(f"Latency: {latency:.2f}s")
-            print("-" * 50)
-            continue
+    discounts = 1.0 / np.log2(np.arange(k) + 2)
+    dcg_scores = (flags * discounts).sum(axis=1)
+    ideal = (np.arange(k)[None, :] < flags.sum(axis=1, keepdims=True)) * discounts
+    idcg = ideal.sum(axis=1)
+    ndcg = np.where(idcg > 0, dcg_scores / np.where(idcg > 0, idcg, 1.0), 0.0)
 
-        # -----------------------------
-        # Semantic Retrieval Metrics
-        # -----------------------------
-        entity_vectors = {ent: get_embedding(ent) for ent in expected_entities}
-        doc_vectors = [get_embedding(doc) for doc in retrieved_docs]
+    return precision, recall, mrr, ndcg
 
-        matched_entities = set()
-        relevant_doc_flags = []
+def rowwise_cosine(emb, a_texts, b_texts):
+    return np.einsum("nd,nd->n", emb.vectors[emb.rows(a_texts)], emb.vectors[emb.rows(b_texts)])
 
-        for doc_vec in doc_vectors:
-            is_relevant = False
-            for ent, ent_vec in entity_vectors.items():
-                if cosine_similarity(doc_vec, ent_vec) >= SIM_THRESHOLD:
-                    is_relevant = True
-                    matched_entities.add(ent)
-                    break
-            relevant_doc_flags.append(1 if is_relevant else 0)
-
-        precision = sum(relevant_doc_flags) / len(retrieved_docs)
-        recall = len(matched_entities) / len(expected_entities) if expected_entities else 0
+# -----------------------------
+# Evaluation Logic
+# -----------------------------
+def evaluate_rag(eval_file=EVAL_FILE, workers=EVAL_WORKERS, verbose=True):
+    with open(eval_file, "r") as f:
+        eval_data = json.load(f)
 
-        precision_scores.append(precision)
-        recall_scores.append(recall)
+    total = len(eval_data)
+    questions = [item["question"] for item in eval_data]
 
-        # -----------------------------
-        # MRR
-        # -----------------------------
-        rr = 0
-        for rank, flag in enumerate(relevant_doc_flags, 1):
-            if flag:
-                rr = 1 / rank
-                break
-        mrr_scores.append(rr)
+    print(f"\n🔍 RAG EVALUATION STARTED ({total} questions, {workers} workers)\n")
 
-        # -----------------------------
-        # nDCG
-        # -----------------------------
-        ideal_scores = sorted(relevant_doc_flags, reverse=True)
-        ndcg = dcg(relevant_doc_flags) / dcg(ideal_scores) if dcg(ideal_scores) > 0 else 0
-        ndcg_scores.append(ndcg)
+    wall_start = time.perf_counter()
+    retrieved = retrieve_all(questions, workers)
+    retrieval_wall = time.perf_counter() - wall_start
 
-        # -----------------------------
-        # Generation Quality
-        # -----------------------------
-        q_vec = get_embedding(question)
-        a_vec = get_embedding(generated_answer)
-        ctx_vec = get_embedding(" ".join(retrieved_docs))
+    latencies = np.asarray([latency for _, latency, _ in retrieved])
+    stage_latencies = {}
+    for _, _, stages in retrieved:
+        for stage, seconds in stages.items():
+            stage_latencies.setdefault(stage, []).append(seconds)
 
-        answer_relevance = cosine_similarity(q_vec, a_vec)
-        faithfulness = cosine_similarity(a_vec, ctx_vec)
-        coherence = cosine_similarity(q_vec, ctx_vec)
+    # -----------------------------
+    # Fallback Handling
+    # -----------------------------
+    answered = [i for i, (docs, _, _) in enumerate(retrieved) if docs]
+    grounded_hits = 0
+    hallucinations = 0
 
-        if faithfulness >= SIM_THRESHOLD:
-            faithfulness_hits += 1
+    for i, (docs, latency, _) in enumerate(retrieved):
+        if docs:
+            continue
+        if not eval_data[i]["answer_expected"]:
             grounded_hits += 1
+            status = "✅ Correct fallback (no context retrieved)"
         else:
             hallucinations += 1
+            status = "❌ Missed retrieval (should have context)"
+        if verbose:
+            print(f"Q{i + 1}: {questions[i]}\n{status}\nLatency: {latency:.2f}s")
+            print("-" * 50)
 
-        if answer_relevance >= SIM_THRESHOLD:
-            relevance_hits += 1
+    precision_scores, recall_scores = np.zeros(0), np.zeros(0)
+    mrr_scores, ndcg_scores = np.zeros(0), np.zeros(0)
+    faithfulness_hits = relevance_hits = coherence_hits = fluency_hits = 0
 
-        if coherence >= SIM_THRESHOLD:
-            coherence_hits += 1
+    if answered:
+        docs = [retrieved[i][0] for i in answered]
+        entities = [eval_data[i]["expected_entities"] for i in answered]
+        asked = [questions[i] for i in answered]
+        generated = [" ".join(d) for d in docs]
 
-        if len(generated_answer.split()) > 5:
-            fluency_hits += 1
+        # -----------------------------
+        # Embed every unique text once
+        # -----------------------------
+        t0 = time.perf_counter()
+        emb = TextMatrix(
+            [t for group in docs for t in group]
+            + [e for group in entities for e in group]
+            + asked + generated
+        )
+        embed_wall = time.perf_counter() - t0
 
-        print(f"Latency: {latency:.2f}s")
-        print("-" * 50)
+        # -----------------------------
+        # Semantic Retrieval Metrics
+        # -----------------------------
+        precision_scores, recall_scores, mrr_scores, ndcg_scores = retrieval_metrics(
+            emb, docs, entities
+        )
+
+        # -----------------------------
+        # Generation Quality
+        # -----------------------------
+        # The generated answer is the joined context, as before
+        answer_relevance = rowwise_cosine(emb, asked, generated)
+        faithfulness = rowwise_cosine(emb, generated, generated)
+        coherence = rowwise_cosine(emb, asked, generated)
+
+        faithful = faithfulness >= SIM_THRESHOLD
+        faithfulness_hits = int(faithful.sum())
+        grounded_hits += faithfulness_hits
+        hallucinations += int((~faithful).sum())
+
+        relevance_hits = int((answer_relevance >= SIM_THRESHOLD).sum())
+        coherence_hits = int((coherence >= SIM_THRESHOLD).sum())
+        fluency_hits = sum(1 for g in generated if len(g.split()) > 5)
+
+        if verbose:
+            for row, i in enumerate(answered):
+                print(f"Q{i + 1}: {questions[i]}")
+                print(f"P={precision_scores[row]:.2f} R={recall_scores[row]:.2f} "
+                      f"RR={mrr_scores[row]:.2f} nDCG={ndcg_scores[row]:.2f}")
+                print(f"Latency: {retrieved[i][1]:.2f}s")
+                print("-" * 50)
+    else:
+        embed_wall = 0.0
+
+    def mean(values):
+        return round(float(np.mean(values)), 3) if len(values) else 0.0
 
     # =============================
-    # FINAL METRICS (AFTER LOOP)
+    # FINAL METRICS
     # =============================
     metrics = {
         "retrieval": {
-            "precision": round(float(np.mean(precision_scores)), 3),
-            "recall": round(float(np.mean(recall_scores)), 3),
-            "mrr": round(float(np.mean(mrr_scores)), 3),
-            "ndcg": round(float(np.mean(ndcg_scores)), 3)
+            "precision": mean(precision_scores),
+            "recall": mean(recall_scores),
+            "mrr": mean(mrr_scores),
+            "ndcg": mean(ndcg_scores)
         },
         "generation": {
             "faithfulness": f"{faithfulness_hits}/{total}",
@@ -172,7 +217,15 @@ def evaluate_rag():
         "system": {
             "hallucination_rate": round(hallucinations / total, 2),
             "groundedness": f"{grounded_hits}/{total}",
-            "avg_latency": round(float(np.mean(latencies)), 2)
+            "avg_latency": round(float(np.mean(latencies)), 2),
+            "stage_latency_ms": {
+                stage: round(float(np.mean(values)) * 1000, 2)
+                for stage, values in stage_latencies.items()
+            },
+            "workers": workers,
+            "retrieval_wall_s": round(retrieval_wall, 2),
+            "embedding_wall_s": round(embed_wall, 2),
+            "throughput_qps": round(total / retrieval_wall, 2) if retrieval_wall else 0.0
         }
     }
 
@@ -200,8 +253,18 @@ def evaluate_rag():
     print(f"Hallucination Rate: {metrics['system']['hallucination_rate']}")
     print(f"Groundedness: {metrics['system']['groundedness']}")
     print(f"Average Latency: {metrics['system']['avg_latency']}s")
+    for stage, ms in metrics["system"]["stage_latency_ms"].items():
+        print(f"  {stage}: {ms} ms")
+    print(f"Throughput: {metrics['system']['throughput_qps']} questions/s "
+          f"({workers} workers)")
 
     print("\n✅ RAG Evaluation Completed\n")
 
 if __name__ == "__main__":
-    evaluate_rag()
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality")
+    parser.add_argument("--eval-file", default=EVAL_FILE)
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    evaluate_rag(args.eval_file, args.workers, verbose=not args.quiet)
@@ -1,11 +1,4 @@
-from qdrant_client import QdrantClient
-import os
-
-client = QdrantClient(
-    url="Your QDRANT_UI",
-    api_key=os.getenv("QDRANT_API_KEY"),
-    check_compatibility=False
-)
-
-
-print(client.get_collections())
+from rag_engine import COLLECTION, vector_store
+from vector_store import VECTOR_BACKEND
+
+print(f"{VECTOR_BACKEND}: {vector_store.count()} points in '{COLLECTION}'")
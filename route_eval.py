@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from intent_router import detect_intents
+from keyword_router import banking_categories
+from query_router import ROUTE_INTENT, ROUTE_LOG_PATH, ROUTE_RAG, ROUTE_RAG_MIN_SCORE, decide_route
+from text_utils import normalize_text
+
+EVAL_FILE = "eval_questions.json"
+OUTPUT_FILE = "route_metrics.json"
+SWEEP_SCORES = (0.2, 0.25, 0.3, 0.35, 0.4, 0.45)
+
+# Routes that answer from document text (retrieved chunks or an intent's chunks)
+GROUNDED_ROUTES = (ROUTE_RAG, ROUTE_INTENT)
+
+# -----------------------------
+# Routing decisions for the eval set
+# -----------------------------
+def route_questions(eval_data, rag_min_score):
+    queries = [normalize_text(item["question"]) for item in eval_data]
+    intents = detect_intents(queries)
+
+    decisions = [
+        decide_route(q, intent, score, banking_categories(q), rag_min_score=rag_min_score)
+        for q, (intent, score) in zip(queries, intents)
+    ]
+    return queries, intents, decisions
+
+
+def accuracy(eval_data, decisions):
+    # Proxy label: document text should be used exactly when it holds the answer
+    expected = np.asarray([item["answer_expected"] for item in eval_data])
+    grounded = np.asarray([d.route in GROUNDED_ROUTES for d in decisions])
+    retrieved = np.asarray([d.route == ROUTE_RAG for d in decisions])
+
+    return {
+        "accuracy": round(float((expected == grounded).mean()), 3),
+        "grounded_when_expected": f"{int((grounded & expected).sum())}/{int(expected.sum())}",
+        "grounded_when_not_expected": f"{int((grounded & ~expected).sum())}/{int((~expected).sum())}",
+        "answered_from_intent": f"{int((grounded & ~retrieved).sum())}/{len(retrieved)}",
+        "retrieval_skipped": f"{int((~retrieved).sum())}/{len(retrieved)}",
+    }
+
+# -----------------------------
+# Latency saved (retrieval timed for every question)
+# -----------------------------
+def measure_savings(queries, decisions):
+    from rag_engine import _rag_retrieve_uncached
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        _rag_retrieve_uncached(q)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.asarray(latencies)
+    skipped = np.asarray([d.route != ROUTE_RAG for d in decisions])
+
+    return {
+        "avg_retrieval_ms": round(float(latencies.mean()) * 1000, 2),
+        "saved_ms_total": round(float(latencies[skipped].sum()) * 1000, 2),
+        "saved_ms_per_query": round(float(latencies[skipped].sum()) / len(queries) * 1000, 2),
+    }
+
+# -----------------------------
+# Production decision log
+# -----------------------------
+def summarize_log(path):
+    if not path or not os.path.exists(path):
+        return None
+
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+
+    summary = {}
+    for route in sorted({r["served_by"] for r in rows}):
+        latencies = np.asarray([r["latency"] for r in rows if r["served_by"] == route], dtype=float)
+        reasons = {}
+        for r in rows:
+            if r["served_by"] == route:
+                reasons[r["reason"]] = reasons.get(r["reason"], 0) + 1
+
+        summary[route] = {
+            "requests": int(latencies.size),
+            "p50_latency": round(float(np.percentile(latencies, 50)), 3),
+            "p95_latency": round(float(np.percentile(latencies, 95)), 3),
+            "reasons": reasons,
+        }
+
+    return summary
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+def evaluate_routing(eval_file=EVAL_FILE, measure=False, log_path=ROUTE_LOG_PATH):
+    with open(eval_file, "r") as f:
+        eval_data = json.load(f)
+
+    print(f"\n🧭 ROUTING EVALUATION ({len(eval_data)} questions)\n")
+
+    queries, intents, decisions = route_questions(eval_data, ROUTE_RAG_MIN_SCORE)
+
+    for item, decision in zip(eval_data, decisions):
+        mark = "✅" if (decision.route in GROUNDED_ROUTES) == item["answer_expected"] else "❌"
+        print(f"{mark} {decision.route:<12} {decision.reason:<17} "
+              f"score={decision.score:.2f}  {item['question']}")
+
+    metrics = {
+        "rag_min_score": ROUTE_RAG_MIN_SCORE,
+        "routing": accuracy(eval_data, decisions),
+        "routes": {},
+        "sweep": {},
+    }
+
+    for d in decisions:
+        metrics["routes"][d.route] = metrics["routes"].get(d.route, 0) + 1
+
+    # Same intent scores, different floor: no re-encoding needed
+    for floor in SWEEP_SCORES:
+        swept = [
+            decide_route(q, intent, score, banking_categories(q), rag_min_score=floor)
+            for q, (intent, score) in zip(queries, intents)
+        ]
+        metrics["sweep"][str(floor)] = accuracy(eval_data, swept)
+
+    if measure:
+        metrics["latency"] = measure_savings(queries, decisions)
+
+    log_summary = summarize_log(log_path)
+    if log_summary is not None:
+        metrics["decision_log"] = log_summary
+
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    print("\n📊 ROUTING SUMMARY\n")
+    print(f"Accuracy: {metrics['routing']['accuracy']} (ROUTE_RAG_MIN_SCORE={ROUTE_RAG_MIN_SCORE})")
+    print(f"Retrieval skipped: {metrics['routing']['retrieval_skipped']}")
+    for floor, result in metrics["sweep"].items():
+        print(f"  min score {floor}: accuracy {result['accuracy']}, "
+              f"skipped {result['retrieval_skipped']}")
+
+    if "latency" in metrics:
+        print(f"Retrieval saved: {metrics['latency']['saved_ms_per_query']} ms/query "
+              f"(avg retrieval {metrics['latency']['avg_retrieval_ms']} ms)")
+
+    if log_summary:
+        print("\n🔹 Decision log")
+        for route, s in log_summary.items():
+            print(f"  {route}: {s['requests']} requests, p50 {s['p50_latency']}s, "
+                  f"p95 {s['p95_latency']}s")
+
+    print(f"\n✅ Results saved to {OUTPUT_FILE}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate query routing decisions")
+    parser.add_argument("--eval-file", default=EVAL_FILE)
+    parser.add_argument("--measure", action="store_true",
+                        help="time retrieval for every question to estimate latency saved")
+    parser.add_argument("--log", default=ROUTE_LOG_PATH, help="decision log to summarise")
+    args = parser.parse_args()
+
+    evaluate_routing(args.eval_file, args.measure, args.log)
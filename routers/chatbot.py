@@ -7,6 +7,6 @@ from services.banking_logic import process_banking_query
 router = APIRouter(prefix="/chatbot", tags=["Banking Chatbot"])
 
 @router.post("/ask")
-def ask_bot(request: ChatRequest):
-    response = process_banking_query(request.message, request.customer_id)
+async def ask_bot(request: ChatRequest):
+    response = await process_banking_query(request.message, request.customer_id)
     return {"reply": response}
@@ -0,0 +1,98 @@
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# --------------------------------------------------
+# CONFIG (opt-in)
+# --------------------------------------------------
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "0") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+
+# Max cosine distance (1 - similarity) between a new query and a cached one
+ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))
+
+# --------------------------------------------------
+# SEMANTIC ANSWER CACHE
+# --------------------------------------------------
+class SemanticAnswerCache:
+    """
+    Ring buffer of (query embedding, retrieved chunk ids, answer).
+
+    A lookup matches when the query is within `max_distance` of a cached
+    query AND retrieval returned the same chunk set, so a cached answer is
+    never served against different context. The oldest entry is
+    overwritten once the buffer is full.
+    """
+
+    def __init__(
+        self,
+        capacity: int = ANSWER_CACHE_SIZE,
+        max_distance: float = ANSWER_CACHE_MAX_DISTANCE,
+    ):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+
+        self._matrix: Optional[np.ndarray] = None  # (capacity, dim), rows L2-normalised
+        self._chunk_sets = [None] * capacity
+        self._answers = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_vec, chunk_ids: Iterable[str]) -> Optional[str]:
+        chunk_set = frozenset(chunk_ids)
+        query = self._normalize(query_vec)
+
+        with self._lock:
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            sims = self._matrix[:self._size] @ query
+            candidates = np.flatnonzero(sims >= 1.0 - self.max_distance)
+
+            for i in candidates[np.argsort(-sims[candidates])]:
+                if self._chunk_sets[i] == chunk_set:
+                    self.hits += 1
+                    return self._answers[i]
+
+            self.misses += 1
+            return None
+
+    def store(self, query_vec, chunk_ids: Iterable[str], answer: str):
+        query = self._normalize(query_vec)
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, query.shape[0]), dtype=np.float32)
+
+            slot = self._next
+            self._matrix[slot] = query
+            self._chunk_sets[slot] = frozenset(chunk_ids)
+            self._answers[slot] = answer
+
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._next = 0
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
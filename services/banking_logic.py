@@ -1,6 +1,6 @@
 from services.llm_engine import smart_llm_reply
 
-def process_banking_query(user_input: str, customer_id: str = None):
+async def process_banking_query(user_input: str, customer_id: str = None):
     user_input = user_input.lower()
 
     # Rule-based
@@ -22,6 +22,6 @@ def process_banking_query(user_input: str, customer_id: str = None):
 
     # AI fallback (OpenAI)
     try:
-        return smart_llm_reply(user_input)
+        return await smart_llm_reply(user_input)
     except Exception as e:
         return f"AI system error: {e}"
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.db"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Evict down to this fraction of the limit so eviction doesn't run on every write
+EVICT_TO_FRACTION = 0.9
+
+# Rows are counted again after this many local inserts (other workers write too)
+EVICT_CHECK_ROWS = 1000
+
+# A hit refreshes last_access only if the stored value is older than this
+TOUCH_INTERVAL = float(os.getenv("EMBED_CACHE_TOUCH_INTERVAL", "3600"))
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+# --------------------------------------------------
+# CONTENT-ADDRESSED EMBEDDING CACHE (SQLite)
+# --------------------------------------------------
+class EmbeddingCache:
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+        # Row count as of the last COUNT(*), plus rows this process added since
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._since_check = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        if not keys:
+            return found
+
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        stale_before = now - TOUCH_INTERVAL
+        touch: List[str] = []
+
+        with self._lock, self._conn:
+            # SQLite caps bound parameters per statement, so look up in slices
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector, last_access FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, dim, blob, last_access in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+                    if last_access < stale_before:
+                        touch.append(key)
+
+            # Eviction is coarse LRU, so only refresh entries that are stale
+            if touch:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in touch],
+                )
+
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, vector.shape[0], vector.tobytes(), now))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings(key, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._since_check += len(rows)
+            if self._count + self._since_check > self.max_entries or self._since_check >= EVICT_CHECK_ROWS:
+                self._evict()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._since_check = 0
+
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * EVICT_TO_FRACTION)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            count -= excess
+
+        self._count = count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,114 @@
+import os
+import threading
+from typing import List
+
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache, cache_key
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+MODEL_NAME = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+
+# "none" | "fp16" | "int8"  (quantised backends are CPU inference only)
+QUANTIZATION = os.getenv("EMBED_QUANTIZATION", "none").lower()
+
+BATCH_SIZE = 32
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+
+# --------------------------------------------------
+# SHARED MODEL (one instance per process, loaded lazily)
+# --------------------------------------------------
+_model = None
+_model_lock = threading.Lock()
+
+
+def _load_model():
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME)
+
+    if QUANTIZATION == "int8":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif QUANTIZATION == "fp16":
+        model = model.half()
+
+    print(f"✅ Embedding model loaded: {MODEL_NAME} ({QUANTIZATION})")
+    return model
+
+
+def get_embedder():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def embedding_dim() -> int:
+    return get_embedder().get_sentence_embedding_dimension()
+
+# --------------------------------------------------
+# PERSISTENT CACHE (shared by every process on the host)
+# --------------------------------------------------
+_cache = None
+
+
+def get_cache():
+    global _cache
+
+    if _cache is None and EMBED_CACHE_ENABLED:
+        with _model_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    vectors = get_embedder().encode(list(texts), batch_size=batch_size)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def encode_many(
+    texts: List[str],
+    batch_size: int = BATCH_SIZE,
+    use_cache: bool = True
+) -> np.ndarray:
+    """Encode a list of texts in batches into a float32 (n, dim) matrix.
+
+    Texts already in the on-disk cache are not re-encoded; only the unique
+    misses go through the model.
+    """
+    if not texts:
+        return np.zeros((0, embedding_dim()), dtype=np.float32)
+
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return _encode_batch(texts, batch_size)
+
+    model_id = f"{MODEL_NAME}:{QUANTIZATION}"
+    keys = [cache_key(model_id, text) for text in texts]
+    found = cache.get_many(keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+
+    if missing:
+        new_vectors = _encode_batch(list(missing.values()), batch_size)
+        computed = dict(zip(missing, new_vectors))
+        cache.put_many(computed)
+        found.update(computed)
+
+    return np.stack([found[key] for key in keys])
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import random
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+# --------------------------------------------------
+# ASYNC CLIENT (OpenAI-compatible chat completions)
+# --------------------------------------------------
+class LLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One pooled keep-alive client, created on first use inside the event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), LLM_BACKOFF_MAX)
+                except ValueError:
+                    pass
+
+        # Full jitter exponential backoff
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+
+            try:
+                response = await client.post(path, json=payload)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise LLMError(f"LLM request failed: {e}") from e
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+
+            try:
+                return response.json()
+            except ValueError as e:
+                raise LLMError(
+                    f"LLM returned non-JSON response ({response.status_code})"
+                ) from e
+
+        raise LLMError("LLM request failed: retries exhausted")
+
+    async def chat(
+        self,
+        messages: List[dict],
+        model: str,
+        temperature: float = 0.7,
+        **params,
+    ) -> dict:
+        payload = {
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            **params,
+        }
+
+        async with self._semaphore:
+            return await self._post("/chat/completions", payload)
+
+    async def stream_chat(
+        self,
+        messages: List[dict],
+        model: str,
+        temperature: float = 0.7,
+        **params,
+    ) -> AsyncIterator[str]:
+        """Yield content deltas of a streamed (SSE) chat completion."""
+        payload = {
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "stream": True,
+            **params,
+        }
+        client = self._get_client()
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                started = False
+
+                try:
+                    async with client.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                            delay = self._backoff(attempt, response)
+                        elif response.status_code >= 400:
+                            await response.aread()
+                            raise LLMError(
+                                f"LLM stream failed ({response.status_code}): {response.text}"
+                            )
+                        else:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    return
+
+                                try:
+                                    chunk = json.loads(data)
+                                except ValueError as e:
+                                    raise LLMError(
+                                        f"LLM stream sent a malformed chunk: {data[:200]}"
+                                    ) from e
+                                choices = chunk.get("choices") or [{}]
+                                delta = choices[0].get("delta", {}).get("content")
+                                if delta:
+                                    started = True
+                                    yield delta
+                            return
+
+                except httpx.TransportError as e:
+                    # Never replay a stream the caller has already started consuming
+                    if started or last_attempt:
+                        raise LLMError(f"LLM stream failed: {e}") from e
+                    delay = self._backoff(attempt)
+
+                await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# --------------------------------------------------
+# SHARED CLIENTS
+# --------------------------------------------------
+groq_client = LLMClient(
+    base_url=os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1"),
+    api_key=os.getenv("GROQ_API_KEY"),
+)
+
+openai_client = LLMClient(
+    base_url=os.getenv("OPENAI_API_URL", "https://api.openai.com/v1"),
+    api_key=os.getenv("OPENAI_API_KEY"),
+)
+
+
+async def close_clients():
+    await groq_client.aclose()
+    await openai_client.aclose()
@@ -1,11 +1,7 @@
-from openai import OpenAI
-import os
+from services.llm_client import LLMError, openai_client
 
-# Make sure your API key is set as an environment variable OR paste it here
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def smart_llm_reply(user_message: str):
-    response = client.chat.completions.create(
+async def smart_llm_reply(user_message: str):
+    response = await openai_client.chat(
         model="gpt-4.1-mini",  
         messages=[
             {
@@ -21,4 +17,7 @@ def smart_llm_reply(user_message: str):
         ]
     )
 
-    return response.choices[0].message.content
+    if "choices" not in response:
+        raise LLMError(response.get("error", "No completion returned"))
+
+    return response["choices"][0]["message"]["content"]
@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" | "sqlite"
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))      # user+assistant pairs
+SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "2000"))  # approx prompt tokens
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))              # idle seconds
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English chat text
+    return max(1, len(text) // 4)
+
+
+def trim_history(messages: List[dict], max_turns: int, max_tokens: int) -> List[dict]:
+    """Drop the oldest user/assistant pairs until both budgets are met."""
+    messages = messages[-max_turns * 2:] if max_turns > 0 else []
+    tokens = sum(estimate_tokens(m["content"]) for m in messages)
+
+    while messages and tokens > max_tokens:
+        for m in messages[:2]:
+            tokens -= estimate_tokens(m["content"])
+        messages = messages[2:]
+
+    return messages
+
+# --------------------------------------------------
+# IN-PROCESS BACKEND (LRU + TTL)
+# --------------------------------------------------
+class InMemorySessionStore:
+    def __init__(
+        self,
+        max_turns: int = SESSION_MAX_TURNS,
+        max_tokens: int = SESSION_MAX_TOKENS,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+    ):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (last_access, messages)
+        self._lock = threading.Lock()
+        self.evicted_sessions = 0
+        self.trimmed_messages = 0
+
+    def _evict(self, now: float):
+        # Oldest-accessed sessions sit at the front of the OrderedDict
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.evicted_sessions += 1
+
+    def get_history(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def append_turn(self, session_id: str, user_message: str, assistant_message: str):
+        now = time.time()
+        with self._lock:
+            _, messages = self._sessions.pop(session_id, (now, []))
+            messages = messages + [
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": assistant_message},
+            ]
+            kept = trim_history(messages, self.max_turns, self.max_tokens)
+            self.trimmed_messages += len(messages) - len(kept)
+
+            self._sessions[session_id] = (now, kept)
+            self._evict(now)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            histories = [messages for _, messages in self._sessions.values()]
+
+        contents = [m["content"] for messages in histories for m in messages]
+        return {
+            "backend": "memory",
+            "sessions": len(histories),
+            "messages": len(contents),
+            "tokens": sum(estimate_tokens(c) for c in contents),
+            "bytes": sum(len(c.encode("utf-8")) for c in contents),
+            "evicted_sessions": self.evicted_sessions,
+            "trimmed_messages": self.trimmed_messages,
+        }
+
+# --------------------------------------------------
+# SQLITE BACKEND (shared by all workers on one host)
+# --------------------------------------------------
+class SQLiteSessionStore:
+    def __init__(
+        self,
+        path: str = SESSION_DB_PATH,
+        max_turns: int = SESSION_MAX_TURNS,
+        max_tokens: int = SESSION_MAX_TOKENS,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+    ):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_access ON sessions(last_access);
+
+            CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, seq);
+
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _bump(self, name: str, amount: int):
+        if amount:
+            self._conn.execute(
+                "INSERT INTO counters(name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+
+    def _evict(self, now: float):
+        expired = self._conn.execute(
+            "SELECT session_id FROM sessions WHERE last_access < ?", (now - self.ttl,)
+        ).fetchall()
+
+        overflow = self._conn.execute(
+            "SELECT COUNT(*) FROM sessions"
+        ).fetchone()[0] - len(expired) - self.max_sessions
+        if overflow > 0:
+            expired += self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_access >= ? "
+                "ORDER BY last_access LIMIT ?",
+                (now - self.ttl, overflow),
+            ).fetchall()
+
+        if expired:
+            self._conn.executemany("DELETE FROM messages WHERE session_id = ?", expired)
+            self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", expired)
+            self._bump("evicted_sessions", len(expired))
+
+    def get_history(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock, self._conn:
+            self._evict(now)
+            updated = self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id)
+            ).rowcount
+            if not updated:
+                return []
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append_turn(self, session_id: str, user_message: str, assistant_message: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions(session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO messages(session_id, role, content) VALUES (?, ?, ?)",
+                [
+                    (session_id, "user", user_message),
+                    (session_id, "assistant", assistant_message),
+                ],
+            )
+
+            rows = self._conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+            messages = [{"role": role, "content": content} for _, role, content in rows]
+            kept = trim_history(messages, self.max_turns, self.max_tokens)
+
+            dropped = len(rows) - len(kept)
+            if dropped:
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                    (session_id, rows[dropped - 1][0]),
+                )
+                self._bump("trimmed_messages", dropped)
+
+            self._evict(now)
+
+    def clear(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages, tokens, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(MAX(1, LENGTH(content) / 4)), 0), "
+                "COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "tokens": tokens,
+            "bytes": size,
+            "evicted_sessions": counters.get("evicted_sessions", 0),
+            "trimmed_messages": counters.get("trimmed_messages", 0),
+        }
+
+# --------------------------------------------------
+# FACTORY
+# --------------------------------------------------
+def create_session_store():
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    return InMemorySessionStore()
@@ -0,0 +1,270 @@
+import atexit
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# "sqlite" sums every worker's observations in one file, so any worker can
+# serve /metrics; "memory" keeps them per process (single-worker setups)
+METRICS_BACKEND = os.getenv("METRICS_BACKEND", "sqlite")
+
+# Workers of one server share a parent process, so by default they share a
+# file that eval scripts and other deployments in this directory don't
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH") or os.path.join(
+    ".cache", f"metrics-{os.getppid()}.db"
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))  # seconds
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# --------------------------------------------------
+# SHARED STORE (one row per histogram/label/bucket, summed across workers)
+# --------------------------------------------------
+class SQLiteMetricStore:
+    def __init__(self, path: str = METRICS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process; never reuse one inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS histograms (
+                    name TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, label, slot)
+                )
+                """
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def add(self, name: str, deltas: Dict[str, list]):
+        rows = [
+            (name, label, slot, value)
+            for label, series in deltas.items()
+            for slot, value in enumerate(series)
+            if value
+        ]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO histograms(name, label, slot, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name, label, slot) DO UPDATE SET value = value + excluded.value",
+                    rows,
+                )
+
+    def read(self, name: str, width: int) -> Dict[str, list]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT label, slot, value FROM histograms WHERE name = ?", (name,)
+            ).fetchall()
+
+        series: Dict[str, list] = {}
+        for label, slot, value in rows:
+            series.setdefault(label, [0] * width)[slot] = value
+        return series
+
+
+METRIC_STORE = SQLiteMetricStore() if METRICS_BACKEND == "sqlite" else None
+
+# --------------------------------------------------
+# HISTOGRAMS (Prometheus text format)
+# --------------------------------------------------
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label: str,
+        buckets: Tuple[float, ...] = BUCKETS,
+        store: Optional[SQLiteMetricStore] = METRIC_STORE,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self.store = store
+        # label value -> [bucket counts..., sum, count]; with a store these
+        # are deltas not yet flushed, otherwise the process totals
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+        if self.store is not None:
+            _start_flusher()
+
+    def flush(self):
+        if self.store is None:
+            return
+
+        with self._lock:
+            pending, self._series = self._series, {}
+        if not pending:
+            return
+
+        try:
+            self.store.add(self.name, pending)
+        except sqlite3.Error as e:
+            print(f"⚠️ Metrics flush failed: {e}")
+            with self._lock:
+                for label_value, deltas in pending.items():
+                    series = self._series.setdefault(label_value, [0] * len(deltas))
+                    for i, delta in enumerate(deltas):
+                        series[i] += delta
+
+    def _snapshot(self) -> Dict[str, list]:
+        if self.store is not None:
+            self.flush()
+            return self.store.read(self.name, len(self.buckets) + 2)
+
+        with self._lock:
+            return {k: list(v) for k, v in self._series.items()}
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+        for value, series in sorted(self._snapshot().items()):
+            labels = f'{self.label}="{value}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {int(count)}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {int(series[-1])}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {int(series[-1])}")
+
+        return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------
+# BACKGROUND FLUSH (the request path never writes to SQLite)
+# --------------------------------------------------
+_flusher = {"pid": None}
+_flusher_lock = threading.Lock()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush_metrics()
+
+
+def _start_flusher():
+    if _flusher["pid"] == os.getpid():
+        return
+
+    with _flusher_lock:
+        if _flusher["pid"] != os.getpid():
+            _flusher["pid"] = os.getpid()
+            threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds", "Time spent in each request stage.", "stage"
+)
+REQUEST_SECONDS = Histogram(
+    "chatbot_request_seconds", "End-to-end /chatbot/ask latency by route.", "route"
+)
+
+# --------------------------------------------------
+# PER-REQUEST TRACE
+# --------------------------------------------------
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(name, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self, route: str) -> dict:
+        """Observe the total latency and return the metrics fields."""
+        total = self.elapsed()
+        REQUEST_SECONDS.observe(route, total)
+        return {
+            "route": route,
+            "latency": round(total, 2),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+        }
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+# --------------------------------------------------
+# HELPERS FOR LIBRARY CODE (histogram only when outside a request)
+# --------------------------------------------------
+def record(name: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, seconds)
+    else:
+        STAGE_SECONDS.observe(name, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def flush_metrics():
+    STAGE_SECONDS.flush()
+    REQUEST_SECONDS.flush()
+
+
+atexit.register(flush_metrics)
+
+
+def render_metrics() -> str:
+    return STAGE_SECONDS.render() + REQUEST_SECONDS.render()
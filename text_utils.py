@@ -1,6 +1,14 @@
 from spellchecker import SpellChecker
+from functools import lru_cache
+import json
+import os
 import re
 
+SPELL_CACHE_SIZE = 50000
+
+# Chunks of Source_Document.docx produced by auto_intent_generator
+DOMAIN_VOCAB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_intents.json")
+
 spell = SpellChecker()
 
 # 🔐 Banking / financial terms that must NEVER be spell-corrected
@@ -39,6 +47,47 @@ PROTECTED_TERMS = {
     # Identifiers & codes
     "micr", "iban", "bic", "swiftcode"
 }
+
+# DOMAIN VOCABULARY
+# --------------------------------------------------
+def load_domain_vocabulary(path: str = DOMAIN_VOCAB_FILE, checker: SpellChecker = None) -> int:
+    """Teach the spell checker (default: ours) every word used in the source document."""
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, "r", encoding="utf-8") as f:
+        intent_map = json.load(f)
+
+    words = {
+        w
+        for texts in intent_map.values()
+        for text in texts
+        for w in re.findall(r"[a-z]+", text.lower())
+        if len(w) > 2
+    }
+    (checker or spell).word_frequency.load_words(words)
+    correct_word.cache_clear()
+    return len(words)
+
+# SPELL CORRECTION (memoised per token)
+# --------------------------------------------------
+@lru_cache(maxsize=SPELL_CACHE_SIZE)
+def correct_word(word: str) -> str:
+    # Do NOT correct protected banking terms, short tokens or numbers
+    if word in PROTECTED_TERMS or not word.isalpha() or len(word) <= 2:
+        return word
+
+    # Fast path: known words never need edit-distance candidates
+    if word in spell:
+        return word
+
+    return spell.correction(word) or word
+
+
+spell.word_frequency.load_words(PROTECTED_TERMS)
+load_domain_vocabulary()
+
+
 def normalize_text(text: str) -> str:
     if not text:
         return ""
@@ -47,17 +96,4 @@ def normalize_text(text: str) -> str:
     text = re.sub(r"[^\w\s]", " ", text)
     text = re.sub(r"\s+", " ", text)
 
-    corrected_words = []
-    for word in text.split():
-        # Do NOT correct protected banking terms
-        if word in PROTECTED_TERMS:
-            corrected_words.append(word)
-
-        # Safe correction for normal words
-        elif word.isalpha() and len(word) > 2:
-            corrected_words.append(spell.correction(word) or word)
-
-        else:
-            corrected_words.append(word)
-
-    return " ".join(corrected_words)
+    return " ".join(correct_word(word) for word in text.split())
@@ -0,0 +1,455 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# "qdrant"       -> remote Qdrant server (QDRANT_URL / QDRANT_API_KEY)
+# "qdrant_local" -> Qdrant embedded local mode, stored under QDRANT_PATH
+# "numpy"        -> memory-mapped NumPy segments under VECTOR_STORE_PATH
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_PATH = os.getenv("QDRANT_PATH", os.path.join(".cache", "qdrant"))
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", os.path.join(".cache", "vectors"))
+
+
+@dataclass
+class VectorPoint:
+    id: str
+    vector: Optional[List[float]] = None
+    payload: dict = field(default_factory=dict)
+    score: float = 0.0
+
+# --------------------------------------------------
+# INTERFACE
+# --------------------------------------------------
+class VectorStore(ABC):
+    """Every backend returns [] from search/retrieve on an empty collection."""
+
+    @abstractmethod
+    def upsert(self, points: List[VectorPoint]):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def search(self, vector, limit: int, with_vectors: bool = False) -> List[VectorPoint]:
+        ...
+
+    @abstractmethod
+    def retrieve(self, ids: List[str], with_vectors: bool = False) -> List[VectorPoint]:
+        """Fetch points by id (missing ids are skipped)."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def ids(self) -> List[str]:
+        """Every stored point id."""
+
+# --------------------------------------------------
+# QDRANT (remote server or embedded local mode)
+# --------------------------------------------------
+class QdrantVectorStore(VectorStore):
+    def __init__(self, client, collection: str, dim: int):
+        self.client = client
+        self.collection = collection
+        self.dim = dim
+        self._ready = False
+
+    def _ensure_collection(self):
+        if self._ready:
+            return
+
+        from qdrant_client.http import models as rest
+
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                collection_name=self.collection,
+                vectors_config=rest.VectorParams(size=self.dim, distance=rest.Distance.COSINE)
+            )
+        self._ready = True
+
+    def upsert(self, points: List[VectorPoint]):
+        from qdrant_client.http import models as rest
+
+        self._ensure_collection()
+        self.client.upsert(
+            collection_name=self.collection,
+            points=[
+                rest.PointStruct(id=p.id, vector=list(p.vector), payload=p.payload)
+                for p in points
+            ]
+        )
+
+    def delete(self, ids: List[str]):
+        from qdrant_client.http import models as rest
+
+        self._ensure_collection()
+        self.client.delete(
+            collection_name=self.collection,
+            points_selector=rest.PointIdsList(points=list(ids))
+        )
+
+    def search(self, vector, limit: int, with_vectors: bool = False) -> List[VectorPoint]:
+        self._ensure_collection()
+        result = self.client.query_points(
+            collection_name=self.collection,
+            query=np.asarray(vector).tolist(),
+            limit=limit,
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+        if not result or not result.points:
+            return []
+
+        return [
+            VectorPoint(id=p.id, vector=p.vector, payload=p.payload, score=p.score)
+            for p in result.points
+        ]
+
+    def retrieve(self, ids: List[str], with_vectors: bool = False) -> List[VectorPoint]:
+        if not ids:
+            return []
+
+        self._ensure_collection()
+        records = self.client.retrieve(
+            collection_name=self.collection,
+            ids=list(ids),
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+        return [VectorPoint(id=r.id, vector=r.vector, payload=r.payload) for r in records]
+
+    def count(self) -> int:
+        self._ensure_collection()
+        return self.client.count(collection_name=self.collection).count
+
+    def ids(self) -> List[str]:
+        self._ensure_collection()
+        found, offset = [], None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection,
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            found.extend(r.id for r in records)
+            if offset is None:
+                return found
+
+# --------------------------------------------------
+# NUMPY (append-only memory-mapped segments, exact cosine search)
+# --------------------------------------------------
+# Tail segments are merged once this many share a level (log-structured)
+SEGMENT_MERGE_FANIN = int(os.getenv("VECTOR_SEGMENT_FANIN", "8"))
+
+# Everything is compacted into one segment once this share of rows is dead
+SEGMENT_COMPACT_RATIO = float(os.getenv("VECTOR_COMPACT_RATIO", "0.3"))
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Single-node store built from immutable segments.
+
+    Each upsert appends one seg-NNNNNN.npy (memory-mapped read-only) and a
+    matching .json with its ids and payloads. Replaced and deleted rows are
+    tombstoned in manifest.json rather than rewritten. Runs of equally sized
+    segments are merged into a bigger one, so ingesting N points writes
+    O(N log N) rows instead of O(N^2). No file is ever replaced while it is
+    mapped: merges write new names, and the old files are removed only after
+    the mappings are released. Other processes pick up changes on their next
+    search.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._manifest_path = os.path.join(path, "manifest.json")
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._segments = {}  # name -> {"vectors", "norms", "ids", "payloads"}
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ---------- Files ----------
+    def _file(self, name: str, ext: str) -> str:
+        return os.path.join(self.path, f"{name}.{ext}")
+
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self._manifest_path):
+            return {"segments": [], "tombstones": {}, "next": 0}
+        with open(self._manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _write_json(self, name: str, ids: List[str], payloads: List[dict]):
+        tmp_path = f"{self._file(name, 'json')}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "payloads": payloads}, f)
+        os.replace(tmp_path, self._file(name, "json"))
+
+    # ---------- Loading ----------
+    def _open_segment(self, name: str) -> dict:
+        vectors = np.load(self._file(name, "npy"), mmap_mode="r")
+        with open(self._file(name, "json"), "r", encoding="utf-8") as f:
+            points = json.load(f)
+
+        norms = np.linalg.norm(vectors, axis=1) if len(vectors) else np.zeros(0, np.float32)
+        norms[norms == 0] = 1.0
+        return {"vectors": vectors, "norms": norms, "ids": points["ids"], "payloads": points["payloads"]}
+
+    def _load(self):
+        manifest = self._read_manifest()
+        names = [seg["name"] for seg in manifest["segments"]]
+
+        # Segments are immutable: only open new ones, release dropped ones
+        segments = {name: self._segments.get(name) or self._open_segment(name) for name in names}
+        self._segments = segments
+
+        self._dead = {}
+        self._row = {}
+        for name in names:
+            dead = np.zeros(len(segments[name]["ids"]), dtype=bool)
+            dead[manifest["tombstones"].get(name, [])] = True
+            self._dead[name] = dead
+            for row, pid in enumerate(segments[name]["ids"]):
+                if not dead[row]:
+                    self._row[pid] = (name, row)
+
+        self._manifest = manifest
+        if os.path.exists(self._manifest_path):
+            self._loaded_mtime = os.stat(self._manifest_path).st_mtime_ns
+
+    def _maybe_reload(self):
+        if not os.path.exists(self._manifest_path):
+            return
+        if os.stat(self._manifest_path).st_mtime_ns != self._loaded_mtime:
+            self._load()
+
+    # ---------- Writes ----------
+    def _tombstone(self, manifest: dict, ids):
+        for pid in ids:
+            location = self._row.get(pid)
+            if location is not None:
+                name, row = location
+                manifest["tombstones"].setdefault(name, []).append(row)
+
+    def _new_segment(self, manifest: dict) -> str:
+        name = f"seg-{manifest['next']:06d}"
+        manifest["next"] += 1
+        return name
+
+    def _merge(self, manifest: dict, merged: List[dict], level: int) -> dict:
+        """Write the live rows of `merged` into one new segment (streamed, not in RAM)."""
+        name = self._new_segment(manifest)
+        live = [
+            (seg["name"], np.flatnonzero(~self._dead[seg["name"]]))
+            for seg in merged
+        ]
+        rows = sum(len(keep) for _, keep in live)
+
+        tmp_path = f"{self._file(name, 'npy')}.{os.getpid()}.tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(rows, self.dim))
+        ids, payloads, offset = [], [], 0
+        for seg_name, keep in live:
+            segment = self._segments[seg_name]
+            out[offset:offset + len(keep)] = segment["vectors"][keep]
+            ids += [segment["ids"][i] for i in keep]
+            payloads += [segment["payloads"][i] for i in keep]
+            offset += len(keep)
+        out.flush()
+        del out  # must be unmapped before the rename on Windows
+
+        os.replace(tmp_path, self._file(name, "npy"))
+        self._write_json(name, ids, payloads)
+
+        for seg in merged:
+            manifest["tombstones"].pop(seg["name"], None)
+        return {"name": name, "rows": rows, "level": level}
+
+    def _maybe_merge(self, manifest: dict) -> bool:
+        segments = manifest["segments"]
+        total = sum(seg["rows"] for seg in segments)
+        dead = sum(len(rows) for rows in manifest["tombstones"].values())
+
+        if total and dead > SEGMENT_COMPACT_RATIO * total:
+            level = max(seg["level"] for seg in segments)
+            manifest["segments"] = [self._merge(manifest, segments, level)]
+            return True
+
+        merged = False
+        while len(segments) >= SEGMENT_MERGE_FANIN:
+            tail = segments[-SEGMENT_MERGE_FANIN:]
+            level = tail[-1]["level"]
+            if any(seg["level"] != level for seg in tail):
+                break
+            segments = segments[:-SEGMENT_MERGE_FANIN] + [self._merge(manifest, tail, level + 1)]
+            merged = True
+
+        manifest["segments"] = segments
+        return merged
+
+    def _remove_unused_files(self):
+        in_use = {seg["name"] for seg in self._manifest["segments"]}
+        for entry in os.listdir(self.path):
+            name, ext = os.path.splitext(entry)
+            if name.startswith("seg-") and ext in (".npy", ".json") and name not in in_use:
+                try:
+                    os.remove(os.path.join(self.path, entry))
+                except OSError:
+                    pass  # still mapped by another process; retried after the next merge
+
+    def _commit(self, manifest: dict):
+        # The manifest is written after the segment files it points to
+        if self._maybe_merge(manifest):
+            self._write_manifest(manifest)
+            self._load()  # releases the merged segments' mappings
+            self._remove_unused_files()
+        else:
+            self._write_manifest(manifest)
+            self._load()
+
+    def upsert(self, points: List[VectorPoint]):
+        # Last write wins within one batch
+        points = list({p.id: p for p in points}.values())
+        if not points:
+            return
+
+        with self._lock:
+            self._maybe_reload()
+            manifest = json.loads(json.dumps(self._manifest))
+
+            name = self._new_segment(manifest)
+            tmp_path = f"{self._file(name, 'npy')}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray([p.vector for p in points], dtype=np.float32))
+            os.replace(tmp_path, self._file(name, "npy"))
+            self._write_json(name, [p.id for p in points], [p.payload for p in points])
+
+            self._tombstone(manifest, [p.id for p in points])
+            manifest["segments"].append({"name": name, "rows": len(points), "level": 0})
+
+            # The new segment has to be known before a merge can read it
+            self._segments[name] = self._open_segment(name)
+            self._dead[name] = np.zeros(len(points), dtype=bool)
+            for seg_name, rows in manifest["tombstones"].items():
+                self._dead[seg_name] = self._dead[seg_name].copy()
+                self._dead[seg_name][rows] = True
+
+            self._commit(manifest)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._maybe_reload()
+            if not any(pid in self._row for pid in ids):
+                return
+
+            manifest = json.loads(json.dumps(self._manifest))
+            self._tombstone(manifest, ids)
+            for seg_name, rows in manifest["tombstones"].items():
+                self._dead[seg_name] = self._dead[seg_name].copy()
+                self._dead[seg_name][rows] = True
+
+            self._commit(manifest)
+
+    # ---------- Reads ----------
+    def search(self, vector, limit: int, with_vectors: bool = False) -> List[VectorPoint]:
+        with self._lock:
+            self._maybe_reload()
+            segments, dead = dict(self._segments), dict(self._dead)
+
+        query = np.asarray(vector, dtype=np.float32)
+        q_norm = np.linalg.norm(query) or 1.0
+
+        candidates = []  # (score, segment name, row)
+        for name, segment in segments.items():
+            if not len(segment["ids"]):
+                continue
+
+            scores = (segment["vectors"] @ query) / (segment["norms"] * q_norm)
+            scores[dead[name]] = -np.inf
+
+            k = min(limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates += [(float(scores[i]), name, int(i)) for i in top if np.isfinite(scores[i])]
+
+        candidates.sort(key=lambda c: -c[0])
+        return [
+            VectorPoint(
+                id=segments[name]["ids"][row],
+                vector=np.asarray(segments[name]["vectors"][row]) if with_vectors else None,
+                payload=segments[name]["payloads"][row],
+                score=score
+            )
+            for score, name, row in candidates[:limit]
+        ]
+
+    def retrieve(self, ids: List[str], with_vectors: bool = False) -> List[VectorPoint]:
+        with self._lock:
+            self._maybe_reload()
+            segments, row_of = self._segments, self._row
+
+        points = []
+        for pid in ids:
+            location = row_of.get(pid)
+            if location is None:
+                continue
+            name, row = location
+            points.append(
+                VectorPoint(
+                    id=pid,
+                    vector=np.asarray(segments[name]["vectors"][row]) if with_vectors else None,
+                    payload=segments[name]["payloads"][row]
+                )
+            )
+        return points
+
+    def count(self) -> int:
+        with self._lock:
+            self._maybe_reload()
+            return len(self._row)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            self._maybe_reload()
+            return list(self._row)
+
+# --------------------------------------------------
+# FACTORY
+# --------------------------------------------------
+def create_vector_store(collection: str, dim: int, backend: str = VECTOR_BACKEND) -> VectorStore:
+    if backend == "numpy":
+        return NumpyVectorStore(os.path.join(VECTOR_STORE_PATH, collection), dim)
+
+    from qdrant_client import QdrantClient
+
+    if backend == "qdrant_local":
+        client = QdrantClient(path=QDRANT_PATH)
+    else:
+        client = QdrantClient(
+            url=QDRANT_URL,
+            api_key=QDRANT_API_KEY,
+            check_compatibility=False
+        )
+
+    return QdrantVectorStore(client, collection, dim)